@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+from collections import deque
+from http.cookies import SimpleCookie
+
+from .auth import SESSION_COOKIE_NAME, session_claims_valid, unsign_session
+from .staticfiles import STATIC_PREFIXES
+
+# Controle de admissão por worker: no máximo ADMISSION_MAX_INFLIGHT requisições dinâmicas nos
+# handlers ao mesmo tempo; as seguintes esperam numa fila curta (FIFO) e, com a fila cheia ou
+# depois de ADMISSION_QUEUE_TIMEOUT segundos, recebem 503 + Retry-After. Assim uma rajada de robô
+# aumenta a fila, não a latência de quem já está sendo atendido. Arquivos estáticos não contam;
+# admin logado passa direto quando está cheio. ADMISSION_MAX_INFLIGHT=0 desliga.
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "32"))
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_RETRY_AFTER = 5
+ADMISSION_EXEMPT_PREFIXES = STATIC_PREFIXES
+
+
+def _is_admin(scope) -> bool:
+    # assinatura do cookie e revogação pelo estado em memória (sem banco): admin desativado ou com
+    # senha/role trocados entra na fila como qualquer um
+    raw = next((v for k, v in scope["headers"] if k == b"cookie"), None)
+    if not raw:
+        return False
+    morsel = SimpleCookie(raw.decode("latin-1")).get(SESSION_COOKIE_NAME)
+    if morsel is None:
+        return False
+    try:
+        claims = unsign_session(morsel.value)
+        return bool(claims) and claims.get("r") == "admin" and session_claims_valid(claims, use_db=False)
+    except Exception:
+        return False
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        max_queue: int = ADMISSION_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.peak_queue = 0
+        self.queue_wait = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "em_andamento": self.in_flight,
+            "na_fila": len(self._waiters),
+            "max_em_andamento": self.max_inflight,
+            "max_fila": self.max_queue,
+            "pico_fila": self.peak_queue,
+            "admitidas": self.admitted,
+            "enfileiradas": self.queued,
+            "descartadas": self.shed,
+            "espera_media_ms": round(1000.0 * self.queue_wait / self.queued, 2) if self.queued else 0.0,
+        }
+
+    def release(self) -> None:
+        # passa a vaga direto para o primeiro da fila (in_flight não muda)
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.in_flight -= 1
+
+    def _expire(self, fut: asyncio.Future) -> None:
+        if not fut.done():
+            fut.set_result(False)
+            self._waiters.remove(fut)
+
+    async def _wait_turn(self) -> bool:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        self.queued += 1
+        self.peak_queue = max(self.peak_queue, len(self._waiters))
+        started = time.perf_counter()
+        timer = loop.call_later(self.queue_timeout, self._expire, fut)
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            # cliente desistiu: devolve a vaga se ela já tinha sido entregue
+            if fut.done() and not fut.cancelled() and fut.result():
+                self.release()
+            elif fut in self._waiters:
+                self._waiters.remove(fut)
+            raise
+        finally:
+            timer.cancel()
+            self.queue_wait += time.perf_counter() - started
+
+    async def acquire(self, scope) -> bool | None:
+        # True: ocupa uma vaga (chamar release no fim); None: admin, passa sem contar; False: descartar
+        if self.in_flight < self.max_inflight and not self._waiters:
+            self.in_flight += 1
+        elif _is_admin(scope):
+            return None
+        elif len(self._waiters) >= self.max_queue or not await self._wait_turn():
+            self.shed += 1
+            return False
+        self.admitted += 1
+        return True
+
+
+admission = AdmissionController()
+
+
+async def _reject(send) -> None:
+    body = "Servidor ocupado, tente novamente em instantes.".encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+            (b"cache-control", b"no-store"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    # Middleware ASGI puro; a vaga fica ocupada até a última parte do corpo sair (streaming)
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(ADMISSION_EXEMPT_PREFIXES):
+            return await self.app(scope, receive, send)
+        admitted = await self.controller.acquire(scope)
+        if admitted is False:
+            return await _reject(send)
+        if admitted is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
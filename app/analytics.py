@@ -0,0 +1,95 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from .database import get_session
+from .models import ContatoClique
+
+# Cliques de contato (WhatsApp/telefone) sem depender do GA4: o navegador manda um beacon para
+# /api/eventos, a requisição só anota na memória e uma thread grava em lote (um INSERT com várias
+# linhas) a cada ANALYTICS_FLUSH_SECONDS ou ANALYTICS_BATCH eventos. Cada worker tem seu buffer;
+# se o banco falhar os eventos voltam para o buffer e, passando de ANALYTICS_BUFFER_MAX, são
+# descartados (contados em /admin/metricas).
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "10"))
+ANALYTICS_BATCH = 200
+ANALYTICS_BUFFER_MAX = int(os.getenv("ANALYTICS_BUFFER_MAX", "5000"))
+CONTACT_METHODS = ("whatsapp", "phone")
+
+logger = logging.getLogger("belavista.analytics")
+
+
+class ClickBuffer:
+    def __init__(self, max_events: int = ANALYTICS_BUFFER_MAX):
+        self.max_events = max_events
+        self._events: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def add(self, metodo: str, pagina: str | None) -> None:
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append({"criado_em": datetime.now(timezone.utc), "metodo": metodo, "pagina": pagina})
+            self.received += 1
+            full = len(self._events) >= ANALYTICS_BATCH
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            try:
+                with get_session() as db:
+                    db.execute(insert(ContatoClique), events)
+                    db.commit()
+            except Exception:
+                self.failures += 1
+                logger.exception("falha ao gravar cliques de contato", extra={"eventos": len(events)})
+                with self._lock:
+                    room = self.max_events - len(self._events)
+                    self.dropped += max(0, len(events) - room)
+                    self._events[:0] = events[:room]
+                return 0
+            self.written += len(events)
+            return len(events)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(ANALYTICS_FLUSH_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="contato-cliques", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._events)
+        return {
+            "no_buffer": pending,
+            "recebidos": self.received,
+            "gravados": self.written,
+            "descartados": self.dropped,
+            "falhas": self.failures,
+        }
+
+
+contact_clicks = ClickBuffer()
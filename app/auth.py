@@ -1,9 +1,11 @@
 import base64
 import hashlib
 import hmac
+import json
 import os
 import secrets
-from datetime import datetime, timezone
+import time
+from dataclasses import dataclass
 
 from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy import select
@@ -16,6 +18,28 @@ ADMIN_USER = os.getenv("ADMIN_USER")
 ADMIN_PASS = os.getenv("ADMIN_PASS")
 SESSION_SECRET = os.getenv("SESSION_SECRET")
 SESSION_COOKIE_NAME = "bv_session"
+SESSION_TOKEN_VERSION = 2
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+# Intervalo máximo para um worker enxergar edições feitas em outro worker
+SESSION_STATE_REFRESH_SECONDS = float(os.getenv("SESSION_STATE_REFRESH_SECONDS", "30"))
+# Token mais novo que o cache (usuário criado ou relogado em outro worker): relê só aquele
+# usuário, no máximo uma vez por intervalo, antes de recusar
+SESSION_STATE_RECHECK_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class SessionUser:
+    id: int
+    username: str
+    role: str
+    status: str = "ativo"
+
+
+# user_id -> (session_version, status). Réplica mínima da tabela users em memória para
+# autorizar sem consultar o banco; atualizada nas edições de usuário e periodicamente.
+_session_state: dict[int, tuple[int, str]] = {}
+_session_state_loaded_at: float | None = None
+_session_state_rechecked: dict[int, float] = {}
 
 
 def _require_session_secret() -> str:
@@ -48,28 +72,91 @@ def verify_password(password: str, stored: str) -> bool:
         return False
 
 
-def sign_session(user_id: int) -> str:
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign_session(user: User) -> str:
     secret = _require_session_secret().encode("utf-8")
-    payload = f"{user_id}:{int(datetime.now(tz=timezone.utc).timestamp())}".encode("utf-8")
+    claims = {
+        "v": SESSION_TOKEN_VERSION,
+        "uid": user.id,
+        "u": user.username,
+        "r": user.role,
+        "sv": user.session_version or 1,
+        "exp": int(time.time()) + SESSION_TTL_SECONDS,
+    }
+    # quem emite o token conhece o estado atual do usuário: o próprio worker já aceita a sessão
+    _session_state[user.id] = (claims["sv"], user.status)
+    payload = json.dumps(claims, separators=(",", ":")).encode("utf-8")
     sig = hmac.new(secret, payload, hashlib.sha256).digest()
-    return base64.urlsafe_b64encode(payload).decode("utf-8") + "." + base64.urlsafe_b64encode(sig).decode("utf-8")
+    return _b64encode(payload) + "." + _b64encode(sig)
 
 
-def unsign_session(token: str) -> int | None:
+def unsign_session(token: str) -> dict | None:
     try:
         secret = _require_session_secret().encode("utf-8")
         payload_b64, sig_b64 = token.split(".", 1)
-        payload = base64.urlsafe_b64decode(payload_b64.encode("utf-8"))
-        sig = base64.urlsafe_b64decode(sig_b64.encode("utf-8"))
+        payload = _b64decode(payload_b64)
+        sig = _b64decode(sig_b64)
         expected = hmac.new(secret, payload, hashlib.sha256).digest()
         if not hmac.compare_digest(sig, expected):
             return None
-        user_id_s, _ts = payload.decode("utf-8").split(":", 1)
-        return int(user_id_s)
+        claims = json.loads(payload)
+        # tokens do formato antigo ("user_id:timestamp") não têm versão e exigem novo login
+        if not isinstance(claims, dict) or claims.get("v") != SESSION_TOKEN_VERSION:
+            return None
+        if int(claims["exp"]) < time.time():
+            return None
+        return claims
     except Exception:
         return None
 
 
+def refresh_session_state() -> None:
+    global _session_state, _session_state_loaded_at
+    with get_session() as db:
+        rows = db.execute(select(User.id, User.session_version, User.status)).all()
+    _session_state = {uid: (sv or 1, st) for uid, sv, st in rows}
+    _session_state_loaded_at = time.monotonic()
+
+
+def _session_state_for(user_id: int) -> tuple[int, str] | None:
+    loaded_at = _session_state_loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > SESSION_STATE_REFRESH_SECONDS:
+        try:
+            refresh_session_state()
+        except Exception:
+            # banco indisponível: mantém o último estado conhecido
+            if loaded_at is None:
+                return None
+    return _session_state.get(user_id)
+
+
+def _recheck_session_state(user_id: int) -> tuple[int, str] | None:
+    now = time.monotonic()
+    last = _session_state_rechecked.get(user_id)
+    if last is not None and now - last < SESSION_STATE_RECHECK_SECONDS:
+        return _session_state.get(user_id)
+    if len(_session_state_rechecked) > 10_000:
+        _session_state_rechecked.clear()
+    _session_state_rechecked[user_id] = now
+    try:
+        with get_session() as db:
+            row = db.execute(select(User.session_version, User.status).where(User.id == user_id)).first()
+    except Exception:
+        return _session_state.get(user_id)
+    if row is None:
+        _session_state.pop(user_id, None)
+        return None
+    _session_state[user_id] = (row[0] or 1, row[1])
+    return _session_state[user_id]
+
+
 def bootstrap_admin_user() -> None:
     if not ADMIN_USER or not ADMIN_PASS:
         return
@@ -80,24 +167,39 @@ def bootstrap_admin_user() -> None:
         u = User(username=ADMIN_USER, password_hash=hash_password(ADMIN_PASS), role="admin", status="ativo")
         db.add(u)
         db.commit()
+    refresh_session_state()
+
+
+def session_claims_valid(claims: dict, use_db: bool = True) -> bool:
+    # Revogação: desativar, trocar role/senha ou excluir o usuário incrementa/remove session_version.
+    # use_db=False (middlewares no event loop): só o estado em memória; na dúvida, inválido.
+    uid = int(claims["uid"])
+    if not use_db:
+        state = _session_state.get(uid)
+    else:
+        state = _session_state_for(uid)
+        if state is None or claims["sv"] > state[0]:
+            state = _recheck_session_state(uid)
+    if state is None:
+        return False
+    session_version, user_status = state
+    return user_status == "ativo" and session_version == claims["sv"]
 
 
-def get_current_user(request: Request) -> User | None:
+def get_current_user(request: Request) -> SessionUser | None:
     token = request.cookies.get(SESSION_COOKIE_NAME)
     if not token:
         return None
-    user_id = unsign_session(token)
-    if not user_id:
+    claims = unsign_session(token)
+    if not claims:
         return None
-    with get_session() as db:
-        u = db.get(User, user_id)
-        if not u or u.status != "ativo":
-            return None
-        return u
+    if not session_claims_valid(claims):
+        return None
+    return SessionUser(id=int(claims["uid"]), username=claims["u"], role=claims["r"])
 
 
 def require_role(*roles: str):
-    def _dep(request: Request) -> User:
+    def _dep(request: Request) -> SessionUser:
         u = get_current_user(request)
         if not u:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Login necessário")
@@ -0,0 +1,186 @@
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .database import engine
+
+# Backup online do SQLite (API de backup do próprio SQLite): copia o banco em passos
+# de poucas páginas, pausando entre eles para não segurar o lock e travar quem grava.
+# Se outro processo gravar no meio da cópia, o SQLite recomeça a cópia sozinho.
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", "backups"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "0"))  # 0 = sem agendamento
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_PAUSE = float(os.getenv("BACKUP_STEP_PAUSE", "0.005"))
+BACKUP_MAX_RESTARTS = 3
+BACKUP_PREFIX = "belavista-"
+
+logger = logging.getLogger("belavista.backup")
+
+
+def sqlite_path() -> Path | None:
+    if engine.dialect.name != "sqlite":
+        return None
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return None
+    return Path(database)
+
+
+def list_backups(dest_dir: Path = BACKUP_DIR) -> list[Path]:
+    # nomes com data UTC ordenam cronologicamente
+    return sorted(p for p in dest_dir.glob(f"{BACKUP_PREFIX}*.db*") if not p.name.endswith(".tmp"))
+
+
+def prune_backups(dest_dir: Path = BACKUP_DIR, keep: int = BACKUP_KEEP) -> list[Path]:
+    backups = list_backups(dest_dir)
+    removed = backups[:-keep] if keep > 0 else []
+    for p in removed:
+        p.unlink(missing_ok=True)
+    return removed
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _copy(src: sqlite3.Connection, tmp_path: Path, pages: int, pause: float) -> None:
+    wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+    if wal:
+        # WAL: uma transação de leitura aberta fixa um snapshot sem bloquear quem grava,
+        # então a cópia em passos nunca recomeça
+        src.execute("BEGIN")
+        src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+    restarts = 0
+    last_remaining = None
+
+    def _progress(_status, remaining, _total):
+        nonlocal restarts, last_remaining
+        # "remaining" voltou a crescer: outro processo gravou e o SQLite recomeçou a cópia
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+        # devolve o lock (e a GIL) entre um passo e outro
+        time.sleep(pause)
+
+    dst = sqlite3.connect(tmp_path)
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=_progress)
+        except _Restarted:
+            # gravações contínuas (modo rollback journal): termina num passo único, que
+            # segura o lock só pelo tempo de copiar o arquivo
+            src.backup(dst, pages=-1)
+        ok = dst.execute("PRAGMA quick_check").fetchone()[0]
+        if ok != "ok":
+            raise RuntimeError(f"cópia inconsistente: {ok}")
+    finally:
+        dst.close()
+        if wal:
+            src.rollback()
+
+
+def backup_sqlite(
+    dest_dir: Path = BACKUP_DIR,
+    keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    pause: float = BACKUP_STEP_PAUSE,
+    compress: bool = True,
+) -> Path:
+    src_path = sqlite_path()
+    if src_path is None:
+        raise RuntimeError("backup online disponível apenas para DATABASE_URL sqlite em arquivo")
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    # microssegundos no nome e criação exclusiva do .tmp: dois backups no mesmo instante
+    # (agendado e manual, dois workers) não escrevem no mesmo arquivo
+    for _ in range(5):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        tmp_path = dest_dir / f"{BACKUP_PREFIX}{stamp}.db.tmp"
+        try:
+            tmp_path.open("xb").close()
+            break
+        except FileExistsError:
+            time.sleep(0.001)
+    else:
+        raise RuntimeError("não foi possível reservar um nome para o backup")
+
+    src = sqlite3.connect(src_path, timeout=30)
+    try:
+        _copy(src, tmp_path, pages, pause)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        src.close()
+
+    if compress:
+        final_path = dest_dir / f"{BACKUP_PREFIX}{stamp}.db.gz"
+        with tmp_path.open("rb") as fin, gzip.open(final_path, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        tmp_path.unlink()
+    else:
+        final_path = dest_dir / f"{BACKUP_PREFIX}{stamp}.db"
+        tmp_path.replace(final_path)
+    prune_backups(dest_dir, keep)
+    return final_path
+
+
+def _seconds_until_due(dest_dir: Path, interval: float) -> float:
+    # o último backup existente define o próximo: reinícios e vários workers não duplicam cópias
+    backups = list_backups(dest_dir)
+    if not backups:
+        return 0.0
+    return max(0.0, backups[-1].stat().st_mtime + interval - time.time())
+
+
+def _scheduled_backup(dest_dir: Path, interval: float) -> None:
+    lock = dest_dir / ".backup.lock"
+    while True:
+        time.sleep(_seconds_until_due(dest_dir, interval))
+        try:
+            dest_dir.mkdir(parents=True, exist_ok=True)
+            # lock por arquivo: só um worker copia; lock abandonado (> 1h) é descartado
+            if lock.exists() and time.time() - lock.stat().st_mtime > 3600:
+                lock.unlink(missing_ok=True)
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            time.sleep(60)
+            continue
+        except OSError:
+            logger.exception("backup agendado: diretório indisponível")
+            time.sleep(interval)
+            continue
+        try:
+            os.close(fd)
+            if _seconds_until_due(dest_dir, interval) == 0.0:
+                t0 = time.perf_counter()
+                path = backup_sqlite(dest_dir)
+                logger.info("backup %s em %.1fs", path.name, time.perf_counter() - t0)
+        except Exception:
+            logger.exception("backup agendado falhou")
+            time.sleep(min(interval, 600))
+        finally:
+            lock.unlink(missing_ok=True)
+
+
+def start_backup_scheduler(
+    dest_dir: Path = BACKUP_DIR, interval_hours: float = BACKUP_INTERVAL_HOURS
+) -> threading.Thread | None:
+    if interval_hours <= 0 or sqlite_path() is None:
+        return None
+    thread = threading.Thread(
+        target=_scheduled_backup,
+        args=(dest_dir, interval_hours * 3600),
+        name="sqlite-backup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from importlib import import_module
+
+from .auth import SESSION_COOKIE_NAME
+from .staticfiles import STATIC_PREFIXES
+
+# Cache na CDN: cada rota pública tem sua política (max-age para o navegador, s-maxage e
+# stale-while-revalidate para a CDN) e etiquetas no cabeçalho Surrogate-Key (catalogo, galeria,
+# config, suite-<id>). Quem está logado (cookie bv_session) recebe "private, no-store": a página
+# mostra o menu do usuário. Alterações no painel pedem à CDN para descartar as etiquetas afetadas
+# (purge), por um purger plugável: CDN_PURGER="pacote.modulo:Classe" ou CDN_PURGE_URL (HTTP).
+CDN_S_MAXAGE = int(os.getenv("CDN_S_MAXAGE", "3600"))
+CDN_STALE = int(os.getenv("CDN_STALE_WHILE_REVALIDATE", "86400"))
+CDN_PURGER = os.getenv("CDN_PURGER", "").strip()
+CDN_PURGE_URL = os.getenv("CDN_PURGE_URL", "").strip()
+CDN_PURGE_METHOD = os.getenv("CDN_PURGE_METHOD", "PURGE").strip().upper()
+CDN_PURGE_AUTH = os.getenv("CDN_PURGE_AUTH", "").strip()  # "Nome: valor", ex.: "Fastly-Key: ..."
+CDN_PURGE_RETRIES = 3
+CDN_SKIP_PREFIXES = STATIC_PREFIXES
+PRIVATE = b"private, no-store"
+
+logger = logging.getLogger("belavista.cdn")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    max_age: int
+    s_maxage: int
+    keys: tuple[str, ...] = ()
+
+    def header(self) -> bytes:
+        return (
+            f"public, max-age={self.max_age}, s-maxage={self.s_maxage}, "
+            f"stale-while-revalidate={CDN_STALE}, stale-if-error={CDN_STALE}"
+        ).encode()
+
+
+def _page(*keys: str) -> CachePolicy:
+    # HTML: o navegador sempre volta à CDN; a CDN segura até o purge (ou s-maxage)
+    return CachePolicy(0, CDN_S_MAXAGE, ("config", *keys))
+
+
+# Pelo molde da rota (scope["route"].path). Etiquetas por registro (suite-<id>) vêm do handler,
+# em request.state.surrogate_keys.
+ROUTE_POLICIES: dict[str, CachePolicy] = {
+    "/": _page("catalogo"),
+    "/sobre": _page(),
+    "/contato": _page(),
+    "/suites": _page("catalogo"),
+    # tipo e amenidades vêm do catálogo: qualquer alteração nele derruba os detalhes também
+    "/suites/{slug}": _page("catalogo"),
+    "/apartamentos": _page("catalogo", "galeria"),
+    "/motel-em-rio-pardo": _page("catalogo"),
+    "/robots.txt": CachePolicy(3600, 86400),
+    "/sitemap.xml": CachePolicy(3600, CDN_S_MAXAGE, ("catalogo",)),
+    "/api/suites": CachePolicy(60, CDN_S_MAXAGE, ("catalogo",)),
+    "/api/v1/suites": CachePolicy(60, CDN_S_MAXAGE, ("catalogo",)),
+    # sem seed a ordem muda a cada dia: a CDN não segura mais que uma hora
+    "/api/galeria": CachePolicy(3600, 3600, ("galeria",)),
+    "/api/v1/galeria": CachePolicy(3600, 3600, ("galeria",)),
+}
+
+
+def _has_session(scope) -> bool:
+    raw = next((v for k, v in scope["headers"] if k == b"cookie"), b"")
+    return f"{SESSION_COOKIE_NAME}=".encode() in raw
+
+
+class CDNCacheMiddleware:
+    # Middleware ASGI puro: decide Cache-Control/Surrogate-Key quando a resposta começa (a rota já
+    # foi resolvida). Sem política (painel, login, POST, erros) vira "private, no-store", a menos
+    # que a resposta já traga o seu Cache-Control (ex.: /admin/metricas).
+    def __init__(self, app, policies: dict[str, CachePolicy] = ROUTE_POLICIES):
+        self.app = app
+        self.policies = policies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(CDN_SKIP_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = self._headers(scope, message["status"], message.get("headers", []))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _headers(self, scope, status: int, headers) -> list:
+        route = scope.get("route")
+        policy = self.policies.get(getattr(route, "path", None))
+        public = (
+            policy is not None
+            and status in (200, 304)
+            and scope["method"] in ("GET", "HEAD")
+            and not _has_session(scope)
+        )
+        has_cache_control = any(k == b"cache-control" for k, _ in headers)
+        if not public:
+            if has_cache_control and not _has_session(scope):
+                return headers
+            return [(k, v) for k, v in headers if k != b"cache-control"] + [(b"cache-control", PRIVATE)]
+        keys = list(policy.keys) + list(scope.get("state", {}).get("surrogate_keys") or [])
+        headers = [(k, v) for k, v in headers if k != b"cache-control"]
+        headers.append((b"cache-control", policy.header()))
+        if keys:
+            headers.append((b"surrogate-key", " ".join(keys).encode()))
+        return headers
+
+
+class Purger(ABC):
+    # purge(keys) descarta na CDN tudo que tiver alguma das etiquetas; erro = exceção
+    @abstractmethod
+    def purge(self, keys: list[str]) -> None:
+        ...
+
+
+class HTTPPurger(Purger):
+    # Uma requisição por lote, com as etiquetas separadas por espaço no cabeçalho Surrogate-Key:
+    # serve para Fastly (POST .../service/<id>/purge + Fastly-Key), Varnish com xkey e o
+    # proxy local de scripts/cdn_proxy.py (PURGE).
+    def __init__(self, url: str = CDN_PURGE_URL, method: str = CDN_PURGE_METHOD, auth: str = CDN_PURGE_AUTH):
+        self.url = url
+        self.method = method
+        self.auth = auth
+
+    def purge(self, keys: list[str]) -> None:
+        req = urllib.request.Request(self.url, method=self.method, headers={"Surrogate-Key": " ".join(keys)})
+        if self.auth and ":" in self.auth:
+            name, value = self.auth.split(":", 1)
+            req.add_header(name.strip(), value.strip())
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            resp.read()
+
+
+def load_purger() -> Purger | None:
+    if CDN_PURGER:
+        module, _, attr = CDN_PURGER.partition(":")
+        return getattr(import_module(module), attr)()
+    if CDN_PURGE_URL:
+        return HTTPPurger()
+    return None
+
+
+class PurgeQueue:
+    # O handler só anota as etiquetas; uma thread manda o purge (juntando pedidos seguidos num
+    # lote) e tenta de novo com espera crescente. A resposta ao painel não espera pela CDN.
+    def __init__(self, purger: Purger | None):
+        self.purger = purger
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cdn-purge") if purger else None
+        self.sent = 0
+        self.failed = 0
+        self.last_error: str | None = None
+
+    def purge(self, *keys: str) -> None:
+        if self.purger is None:
+            return
+        with self._lock:
+            schedule = not self._pending
+            self._pending.update(k for k in keys if k)
+        if schedule:
+            self._executor.submit(self._flush)
+
+    def _flush(self) -> None:
+        with self._lock:
+            keys = sorted(self._pending)
+            self._pending.clear()
+        if not keys:
+            return
+        for attempt in range(CDN_PURGE_RETRIES):
+            try:
+                self.purger.purge(keys)
+                self.sent += 1
+                logger.info("purge na CDN: %s", " ".join(keys))
+                return
+            except Exception as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                time.sleep(0.5 * 2 ** attempt)
+        self.failed += 1
+        logger.warning("purge na CDN falhou (%s): %s", " ".join(keys), self.last_error)
+
+    def stats(self) -> dict:
+        return {
+            "purger": type(self.purger).__name__ if self.purger else None,
+            "enviados": self.sent,
+            "falhas": self.failed,
+            "ultimo_erro": self.last_error,
+        }
+
+
+purge_queue = PurgeQueue(load_purger())
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from markupsafe import Markup
+
+# CSS do site: app/assets/critical.css vai inline no <head> de toda página; app/assets/site.css
+# vira app/static/css/site.<hash>.css (nome muda quando o conteúdo muda), servido como imutável.
+# O build roda no deploy (python -m scripts.build_css) e, se faltar ou estiver velho, na subida.
+CSS_SRC_DIR = Path("app/assets")
+CSS_OUT_DIR = Path("app/static/css")
+CSS_MANIFEST = CSS_OUT_DIR / "manifest.json"
+CSS_KEEP_BUILDS = 3  # versões anteriores ficam para HTML que ainda esteja em cache
+
+_COMMENTS = re.compile(r"/\*.*?\*/", re.S)
+_SPACES = re.compile(r"\s+")
+_AROUND = re.compile(r"\s*([{};:,>])\s*")
+
+
+def minify_css(text: str) -> str:
+    text = _COMMENTS.sub("", text)
+    text = _SPACES.sub(" ", text)
+    text = _AROUND.sub(r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def _sources_digest() -> str:
+    h = hashlib.sha256()
+    for name in ("critical.css", "site.css"):
+        h.update(name.encode())
+        h.update((CSS_SRC_DIR / name).read_bytes())
+    return h.hexdigest()
+
+
+def _read_manifest() -> dict | None:
+    try:
+        return json.loads(CSS_MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def build_css() -> dict:
+    site = minify_css((CSS_SRC_DIR / "site.css").read_text(encoding="utf-8"))
+    digest = hashlib.sha256(site.encode()).hexdigest()[:12]
+    name = f"site.{digest}.css"
+    CSS_OUT_DIR.mkdir(parents=True, exist_ok=True)
+    dest = CSS_OUT_DIR / name
+    if not dest.exists():
+        tmp = dest.with_name(f".{name}.{os.getpid()}.tmp")
+        tmp.write_text(site, encoding="utf-8")
+        tmp.replace(dest)
+
+    previous = _read_manifest() or {}
+    history = [name] + [n for n in previous.get("historico", []) if n != name]
+    manifest = {
+        "fontes": _sources_digest(),
+        "site.css": f"/static/css/{name}",
+        "critico": minify_css((CSS_SRC_DIR / "critical.css").read_text(encoding="utf-8")),
+        "historico": history[:CSS_KEEP_BUILDS],
+    }
+    tmp = CSS_MANIFEST.with_name(f".manifest.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    tmp.replace(CSS_MANIFEST)
+
+    for old in CSS_OUT_DIR.glob("site.*.css"):
+        if old.name not in manifest["historico"]:
+            old.unlink(missing_ok=True)
+    return manifest
+
+
+_manifest: dict | None = None
+
+
+def load_css() -> dict:
+    global _manifest
+    manifest = _read_manifest()
+    if manifest is None or manifest.get("fontes") != _sources_digest():
+        manifest = build_css()
+    _manifest = manifest
+    return manifest
+
+
+def _current() -> dict:
+    return _manifest if _manifest is not None else load_css()
+
+
+def stylesheet_url() -> str:
+    return _current()["site.css"]
+
+
+def critical_css() -> Markup:
+    return Markup(_current()["critico"])
@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+# Cache de fragmentos de template: {% cache "rodape" %}...{% endcache %} renderiza o trecho uma
+# vez e reaproveita o HTML. A chave junta os argumentos da tag com a versão da SiteConfig (os
+# valores da linha), então salvar a /config invalida em todos os workers sem aviso entre eles.
+# Tudo que o trecho usa e varia por página/usuário precisa estar nos argumentos.
+FRAGMENT_CACHE_MAX = int(os.getenv("FRAGMENT_CACHE_MAX", "256"))
+
+
+class FragmentCache:
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_MAX):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"fragmentos": len(self._entries), "max": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+fragment_cache = FragmentCache()
+
+
+def site_version(site) -> tuple:
+    # os próprios valores da SiteConfig (updated_at tem resolução de 1s no SQLite)
+    if not site:
+        return ()
+    return tuple(getattr(site, c.key) for c in site.__table__.columns)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        args = [nodes.Const(parser.name), nodes.List(parts), nodes.Name("site", "load")]
+        return nodes.CallBlock(self.call_method("_cached", args), [], [], body).set_lineno(lineno)
+
+    def _cached(self, template: str, parts: list, site, caller) -> str:
+        key = (template, *parts, *site_version(site))
+        html = fragment_cache.get(key)
+        if html is None:
+            html = caller()
+            fragment_cache.set(key, str(html))
+        return Markup(html)
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from urllib.parse import quote
+
+from .staticfiles import STATIC_PREFIXES
+
+# Preload do que a página usa logo de cara (logo, CSS, a foto principal): vira cabeçalho Link na
+# resposta HTML e, se o servidor suportar a extensão ASGI "http.response.early_hint" (Hypercorn,
+# por exemplo; o uvicorn ainda não), um 103 Early Hints enviado antes de o handler rodar. O 103 usa
+# o que a última renderização da mesma rota pediu, guardado em memória: nenhuma consulta a mais.
+HINTS_MAX_PATHS = 1024
+HINTS_SKIP_PREFIXES = STATIC_PREFIXES + ("/api/", "/admin/perfis")
+
+
+def link_header_values(preloads: list[dict]) -> list[bytes]:
+    links = []
+    for p in preloads:
+        parts = [f"<{quote(p['href'], safe=':/?&=%#,;@+~')}>", "rel=preload", f"as={p['as']}"]
+        if p.get("type"):
+            parts.append(f'type="{p["type"]}"')
+        if p.get("imagesrcset"):
+            parts.append(f'imagesrcset="{quote(p["imagesrcset"], safe=":/?&=%#,;@+~ ")}"')
+            parts.append(f'imagesizes="{p.get("imagesizes") or "(max-width: 640px) 100vw, 33vw"}"')
+        links.append("; ".join(parts).encode("latin-1"))
+    return links
+
+
+class EarlyHintsMiddleware:
+    # Middleware ASGI puro. base() devolve os preloads comuns a toda página (logo, CSS); os da
+    # página vêm de scope["state"]["preload"], preenchido pelo _render_context.
+    def __init__(self, app, base):
+        self.app = app
+        self.base = base
+        self._links: OrderedDict[str, list[bytes]] = OrderedDict()
+
+    def _remember(self, path: str, links: list[bytes]) -> None:
+        self._links[path] = links
+        self._links.move_to_end(path)
+        while len(self._links) > HINTS_MAX_PATHS:
+            self._links.popitem(last=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"].startswith(HINTS_SKIP_PREFIXES):
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+
+        if "http.response.early_hint" in scope.get("extensions", {}):
+            links = self._links.get(path)
+            if links is None:
+                # rota ainda não renderizada: só navegação (Accept: text/html) leva os preloads comuns
+                accept = next((v for k, v in scope["headers"] if k == b"accept"), b"")
+                links = link_header_values(self.base()) if b"text/html" in accept else None
+            if links:
+                await send({"type": "http.response.early_hint", "links": links})
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = message.get("headers", [])
+                content_type = next((v for k, v in headers if k == b"content-type"), b"")
+                if content_type.startswith(b"text/html"):
+                    preloads = self.base() + list(scope.get("state", {}).get("preload") or [])
+                    links = link_header_values(preloads)
+                    self._remember(path, links)
+                    message["headers"] = list(headers) + [(b"link", b", ".join(links))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
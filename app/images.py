@@ -0,0 +1,141 @@
+import base64
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# Redimensionamento sob demanda (/img/{largura}/{caminho}): só larguras desta lista,
+# para ninguém encher o cache pedindo /img/601, /img/602...
+IMG_WIDTHS = tuple(sorted({int(w) for w in os.getenv("IMG_WIDTHS", "160,320,480,600,800,1200,1600").split(",") if w.strip()}))
+IMG_CACHE_DIR = Path(os.getenv("IMG_CACHE_DIR", "img_cache"))
+IMG_CACHE_MAX_MB = float(os.getenv("IMG_CACHE_MAX_MB", "256"))
+IMG_QUALITY = 80
+IMG_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+LQIP_SIZE = 16  # lado maior do placeholder embutido no HTML (px)
+
+
+class DiskLRU:
+    # Cache em disco limitado por tamanho: o atime do arquivo marca o último uso (sobrevive a
+    # reinícios; o mtime fica intacto porque compõe o ETag) e os menos usados são apagados
+    # quando o total passa do limite.
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        self._loaded = False
+
+    def _load(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for p in self.directory.glob("*.webp"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_atime, p.name, st.st_size))
+        for _atime, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+        self._loaded = True
+
+    def path(self, name: str) -> Path:
+        return self.directory / name
+
+    def touch(self, name: str) -> bool:
+        # True se está em cache (e passa a ser o mais recente)
+        path = self.path(name)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if name not in self._entries:
+                # gerado por outro worker
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    return False
+                self._add(name, size)
+                return True
+            self._entries.move_to_end(name)
+        try:
+            os.utime(path, (time.time(), path.stat().st_mtime))
+        except OSError:
+            # apagado por outro worker
+            with self._lock:
+                self._total -= self._entries.pop(name, 0)
+            return False
+        return True
+
+    def add(self, name: str, size: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._add(name, size)
+
+    def _add(self, name: str, size: int) -> None:
+        self._total += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            old, old_size = self._entries.popitem(last=False)
+            self._total -= old_size
+            self.path(old).unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"files": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+img_cache = DiskLRU(IMG_CACHE_DIR, int(IMG_CACHE_MAX_MB * 1024 * 1024))
+
+
+def resize_image(src: Path, dest: Path, width: int) -> int:
+    # Roda numa thread de trabalho. JPEG decodifica já reduzido (draft); nunca amplia.
+    with Image.open(src) as im:
+        w, h = im.size
+        # largura pedida vale para a imagem já na orientação da câmera (EXIF 5-8 = girada 90°)
+        rotated = im.getexif().get(0x0112) in (5, 6, 7, 8)
+        shown_w = h if rotated else w
+        if im.format == "JPEG" and width < shown_w:
+            scale = width / shown_w
+            im.draft("RGB", (max(1, round(w * scale)), max(1, round(h * scale))))
+        im = ImageOps.exif_transpose(im)
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        im = im.convert("RGBA" if has_alpha else "RGB")
+        im.thumbnail((width, im.height), Image.Resampling.LANCZOS)
+        tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+        try:
+            im.save(tmp, format="WEBP", quality=IMG_QUALITY, method=4)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    size = tmp.stat().st_size
+    os.replace(tmp, dest)
+    return size
+
+
+def placeholder(src: Path) -> dict:
+    # Dimensões (já na orientação do EXIF), cor dominante e uma miniatura de LQIP_SIZE px em
+    # data URI: o HTML reserva o espaço e pinta algo parecido com a foto antes de ela chegar.
+    with Image.open(src) as im:
+        rotated = im.getexif().get(0x0112) in (5, 6, 7, 8)
+        w, h = (im.height, im.width) if rotated else im.size
+        if im.format == "JPEG":
+            im.draft("RGB", (LQIP_SIZE * 8, LQIP_SIZE * 8))
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        im.thumbnail((LQIP_SIZE, LQIP_SIZE), Image.Resampling.LANCZOS)
+    # cor mais frequente entre 4 tons (a média de fotos escuras com uma janela clara vira cinza)
+    counts = im.quantize(colors=4).convert("RGB").getcolors(LQIP_SIZE * LQIP_SIZE)
+    r, g, b = max(counts)[1]
+    buf = io.BytesIO()
+    im.save(buf, format="WEBP", quality=40, method=6)
+    return {
+        "w": w,
+        "h": h,
+        "cor": f"#{r:02x}{g:02x}{b:02x}",
+        "lqip": "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii"),
+    }
@@ -0,0 +1,292 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+from pathlib import Path
+
+from sqlalchemy import event
+
+# Log estruturado (JSON por linha) de acesso e de eventos do app. A requisição só enfileira
+# o registro (QueueHandler, sem I/O); uma thread grava em lotes, com rotação por tamanho.
+# Com a fila enchendo, o log de acesso passa a ser amostrado (erros e lentos sempre entram)
+# e, se lotar, descarta e conta os descartes em vez de bloquear.
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1").lower() not in ("0", "false", "no")
+LOG_FILE = os.getenv("LOG_FILE", "logs/belavista.log")  # vazio = stdout; "{pid}" = um arquivo por worker
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "10")) * 1024 * 1024
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_BATCH = 500
+LOG_FLUSH_SECONDS = 1.0
+LOG_SAMPLE_ABOVE = 0.5  # fração da fila a partir da qual o acesso é amostrado
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "500"))
+
+access_logger = logging.getLogger("belavista.access")
+app_logger = logging.getLogger("belavista")
+
+# tempo de banco da requisição atual: [segundos, consultas]
+_db_time: ContextVar[list | None] = ContextVar("db_time", default=None)
+_STOP = object()
+
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # a formatação fica para a thread de escrita: aqui só congela a mensagem
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BatchRotatingFileHandler(RotatingFileHandler):
+    def write_batch(self, data: str) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+            self.doRollover()
+        self.stream.write(data)
+        self.stream.flush()
+
+
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+def _to_json(record: logging.LogRecord) -> str:
+    entry = {
+        "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+        "level": record.levelname.lower(),
+        "logger": record.name,
+    }
+    if record.msg:
+        entry["msg"] = record.msg
+    for key, value in record.__dict__.items():
+        if key not in _RESERVED:
+            entry[key] = value
+    if record.exc_text:
+        entry["exc"] = record.exc_text
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LogWriter(threading.Thread):
+    def __init__(self, q: queue.Queue, handler: DroppingQueueHandler, path: str):
+        super().__init__(name="log-writer", daemon=True)
+        self.q = q
+        self.handler = handler
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.file = _BatchRotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        else:
+            self.file = None
+        self._reported_drops = 0
+
+    def _write(self, lines: list[str]) -> None:
+        dropped = self.handler.dropped
+        if dropped != self._reported_drops:
+            lines.append(json.dumps({
+                "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "level": "warning",
+                "logger": "belavista.log",
+                "msg": "registros descartados (fila cheia)",
+                "dropped": dropped - self._reported_drops,
+            }))
+            self._reported_drops = dropped
+        data = "\n".join(lines) + "\n"
+        try:
+            if self.file is not None:
+                self.file.write_batch(data)
+            else:
+                sys.stdout.write(data)
+                sys.stdout.flush()
+        except Exception:
+            pass
+
+    def run(self) -> None:
+        while True:
+            record = self.q.get()
+            if record is _STOP:
+                return
+            # junta o que chegar em até LOG_FLUSH_SECONDS (ou LOG_BATCH registros) numa escrita só
+            lines = [_to_json(record)]
+            deadline = time.monotonic() + LOG_FLUSH_SECONDS
+            stop = False
+            while len(lines) < LOG_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self.q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                    break
+                lines.append(_to_json(record))
+            self._write(lines)
+            if stop:
+                return
+
+    def stop(self) -> None:
+        self.q.put(_STOP)
+        self.join(timeout=5)
+
+
+_queue: queue.Queue | None = None
+_writer: LogWriter | None = None
+
+
+def _add_db_time(seconds: float, queries: int = 0) -> None:
+    acc = _db_time.get()
+    if acc is not None:
+        acc[0] += seconds
+        acc[1] += queries
+
+
+# O início fica no contexto de execução da própria consulta: uma consulta que falha não deixa
+# sobra para a próxima (e o tempo dela conta, pelo handle_error).
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._log_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_log_started", None)
+    if started is not None:
+        _add_db_time(time.perf_counter() - started, 1)
+
+
+def _handle_error(exception_context):
+    started = getattr(exception_context.execution_context, "_log_started", None)
+    if started is not None:
+        _add_db_time(time.perf_counter() - started, 1)
+
+
+class _TimedCursor(sqlite3.Cursor):
+    # No sqlite3 a consulta anda a cada fetch (execute só acha a primeira linha): esse tempo
+    # também é de banco. No psycopg o resultado já vem inteiro no execute.
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _add_db_time(time.perf_counter() - started)
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(*args, **kwargs)
+        finally:
+            _add_db_time(time.perf_counter() - started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _add_db_time(time.perf_counter() - started)
+
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+
+def _timed_sqlite_connect(dialect, conn_rec, cargs, cparams):
+    cparams.setdefault("factory", _TimedConnection)
+
+
+def setup_logging(*engines) -> None:
+    global _queue, _writer
+    if _writer is not None:
+        return
+    _queue = queue.Queue(maxsize=LOG_QUEUE_MAX)
+    handler = DroppingQueueHandler(_queue)
+    app_logger.addHandler(handler)
+    app_logger.setLevel(logging.INFO)
+    app_logger.propagate = False
+    _writer = LogWriter(_queue, handler, LOG_FILE.format(pid=os.getpid()))
+    _writer.start()
+    atexit.register(_writer.stop)
+    for eng in dict.fromkeys(engines):
+        event.listen(eng, "before_cursor_execute", _before_cursor_execute)
+        event.listen(eng, "after_cursor_execute", _after_cursor_execute)
+        event.listen(eng, "handle_error", _handle_error)
+        if eng.dialect.name == "sqlite":
+            event.listen(eng, "do_connect", _timed_sqlite_connect)
+
+
+def _keep_access(status_code: int, duration_ms: float) -> float | None:
+    # Devolve a taxa de amostragem do registro (1.0 = todos) ou None para não registrar
+    q = _queue
+    if q is None:
+        return None
+    if status_code >= 500 or duration_ms >= LOG_SLOW_MS or q.qsize() < LOG_QUEUE_MAX * LOG_SAMPLE_ABOVE:
+        return 1.0
+    return LOG_SAMPLE_RATE if random.random() < LOG_SAMPLE_RATE else None
+
+
+class AccessLogMiddleware:
+    # Middleware ASGI puro: mede do início ao último byte da resposta, junta o tempo de banco
+    # (eventos do SQLAlchemy) e enfileira um registro por requisição.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _queue is None:
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        db = [0.0, 0]
+        token = _db_time.set(db)
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _db_time.reset(token)
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            rate = _keep_access(status_code, duration_ms)
+            if rate is not None:
+                route = scope.get("route")
+                entry = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    # modelo da rota ("/suites/{slug}") ou prefixo do mount ("/static"); None sem rota
+                    "route": getattr(route, "path", None) or scope.get("root_path") or None,
+                    "status": status_code,
+                    "ms": round(duration_ms, 2),
+                    "db_ms": round(db[0] * 1000.0, 2),
+                    "db_queries": db[1],
+                    "bytes": size,
+                }
+                if rate < 1.0:
+                    entry["sample_rate"] = rate
+                access_logger.info("", extra=entry)
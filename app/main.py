@@ -1,34 +1,90 @@
-from fastapi import FastAPI, Request, Form, status, Depends
+from fastapi import FastAPI, Request, Form, Query, status, Depends
 from fastapi import HTTPException
 from fastapi.exception_handlers import http_exception_handler as fastapi_http_exception_handler
-from fastapi.responses import HTMLResponse, RedirectResponse, Response, PlainTextResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from jinja2 import Environment, FileSystemLoader, select_autoescape
-from sqlalchemy import select
+from sqlalchemy import case, select, func, tuple_, update
 from sqlalchemy.orm import selectinload
-from .database import Base, engine, get_session
-from .models import SiteConfig, TipoSuite, Amenidade, Suite, Foto, Funcionario, User
+from PIL import Image, UnidentifiedImageError
+from .admission import ADMISSION_MAX_INFLIGHT, AdmissionMiddleware, admission
+from .analytics import CONTACT_METHODS, contact_clicks
+from .backup import start_backup_scheduler
+from .cdn import CDNCacheMiddleware, purge_queue
+from .css import critical_css, load_css, stylesheet_url
+from .fragments import FragmentCacheExtension, fragment_cache
+from .hints import EarlyHintsMiddleware
+from .ratelimit import RateLimitMiddleware, limiter
+from .maps import MAPS_PREVIEW_DIR, generate_preview
+from .images import IMG_CACHE_DIR, IMG_EXTS, IMG_WIDTHS, img_cache, placeholder, resize_image
+from .profiling import (
+    PROFILE_MAX_REQUESTS,
+    ProfileMiddleware,
+    arm as arm_profiler,
+    current_target,
+    disarm as disarm_profiler,
+    list_profiles,
+    load_profile,
+    profile_threads,
+)
+from .logs import ACCESS_LOG, AccessLogMiddleware, setup_logging
+from .database import Base, engine, get_read_session, get_session, read_engine, use_primary
+from .models import SiteConfig, TipoSuite, Amenidade, Suite, Foto, Funcionario, User, ContatoClique, suite_amenidade
+from .staticfiles import CachedStaticFiles
+from .search import (
+    ensure_search_index,
+    reindex_suites,
+    remove_suites,
+    search_suites,
+    suite_ids_for_amenidade,
+    suite_ids_for_tipo,
+)
 from .auth import (
     bootstrap_admin_user,
     get_current_user,
+    refresh_session_state,
     require_role,
     sign_session,
     verify_password,
+    SessionUser,
     SESSION_COOKIE_NAME,
+    SESSION_TTL_SECONDS,
     hash_password,
 )
 from typing import List
+import asyncio
+import logging
 import re
 import os
+import json
+import base64
+import hashlib
 import random
 from pathlib import Path
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlencode
+
+# Log estruturado em fila (gravado em lotes por uma thread); também mede o tempo de banco
+setup_logging(engine, read_engine)
+logger = logging.getLogger("belavista.app")
 
 # Garantir criação das tabelas inicialmente (depois usaremos Alembic)
 Base.metadata.create_all(bind=engine)
 
+# Migração leve: users.session_version (tokens de sessão versionados), antes de qualquer consulta a User
+try:
+    with engine.begin() as conn:
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            user_cols = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(users)").fetchall()}
+            if "session_version" not in user_cols:
+                conn.exec_driver_sql("ALTER TABLE users ADD COLUMN session_version INTEGER NOT NULL DEFAULT 1")
+        elif dialect == "postgresql":
+            conn.exec_driver_sql("ALTER TABLE users ADD COLUMN IF NOT EXISTS session_version INTEGER NOT NULL DEFAULT 1")
+except Exception:
+    pass
+
 try:
     bootstrap_admin_user()
 except Exception:
@@ -49,6 +105,65 @@ except Exception:
     # silencioso em dev; em prod usar Alembic
     pass
 
+# Migração leve: placeholder das fotos (largura, altura, cor, lqip) e fachada do mapa
+_novas_colunas = {
+    "fotos": {"largura": "INTEGER", "altura": "INTEGER", "cor": "VARCHAR(9)", "lqip": "VARCHAR(1000)"},
+    "site_config": {"maps_modo": "VARCHAR(20)", "maps_preview": "VARCHAR(300)"},
+}
+try:
+    with engine.begin() as conn:
+        dialect = engine.dialect.name
+        for _table, _cols in _novas_colunas.items():
+            if dialect == "sqlite":
+                _existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({_table})").fetchall()}
+                for _col, _type in _cols.items():
+                    if _col not in _existing:
+                        conn.exec_driver_sql(f"ALTER TABLE {_table} ADD COLUMN {_col} {_type}")
+            elif dialect == "postgresql":
+                for _col, _type in _cols.items():
+                    conn.exec_driver_sql(f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS {_col} {_type}")
+except Exception:
+    pass
+
+# Capa única por suíte: normaliza dados antigos (várias ou nenhuma capa) antes do índice único parcial
+try:
+    with engine.begin() as conn:
+        _suites_irregulares = conn.execute(
+            select(Foto.suite_id)
+            .group_by(Foto.suite_id)
+            .having(func.sum(case((Foto.capa == True, 1), else_=0)) != 1)  # noqa: E712
+        ).scalars().all()
+        for _sid in _suites_irregulares:
+            _first = conn.execute(
+                select(Foto.id).where(Foto.suite_id == _sid).order_by(Foto.capa.desc(), Foto.ordem, Foto.id).limit(1)
+            ).scalar_one()
+            conn.execute(update(Foto).where(Foto.suite_id == _sid).values(capa=(Foto.id == _first)))
+except Exception:
+    pass
+
+# Índices novos em bancos já existentes (create_all só cria índices junto com a tabela)
+for _table in Base.metadata.sorted_tables:
+    for _index in _table.indexes:
+        try:
+            _index.create(bind=engine, checkfirst=True)
+        except Exception:
+            pass
+
+# Busca textual (FTS5 no SQLite, tsvector no PostgreSQL); reconstrói se estiver defasada
+try:
+    ensure_search_index()
+except Exception:
+    pass
+
+# Backup online agendado do SQLite (BACKUP_INTERVAL_HOURS > 0), numa thread em segundo plano
+start_backup_scheduler()
+
+# Cliques de contato (beacon /api/eventos): gravação em lote numa thread deste worker
+contact_clicks.start()
+
+# CSS com hash no nome: refeito aqui se o deploy não rodou o build ou o fonte mudou
+load_css()
+
 app = FastAPI(title="Motel Bela Vista - Rio Pardo/RS")
 
 SITE_URL = os.getenv("SITE_URL", "https://www.motelbelavista.com.br").rstrip("/")
@@ -71,42 +186,84 @@ async def enforce_canonical_host(request: Request, call_next):
         return RedirectResponse(url=location, status_code=status.HTTP_301_MOVED_PERMANENTLY)
     return await call_next(request)
 
+
+# Réplica de leitura (DATABASE_READ_URL): páginas públicas leem da réplica. Depois de uma
+# gravação no painel, o cookie abaixo manda as leituras desse navegador ao primário por
+# alguns segundos, para quem salvou ver a mudança antes de a réplica alcançar.
+PRIMARY_STICKY_COOKIE = "bv_primary"
+PRIMARY_STICKY_SECONDS = int(os.getenv("PRIMARY_STICKY_SECONDS", "15"))
+
+
+async def route_reads(request: Request, call_next):
+    token = use_primary.set(PRIMARY_STICKY_COOKIE in request.cookies)
+    try:
+        response = await call_next(request)
+    finally:
+        use_primary.reset(token)
+    path = request.url.path
+    if (
+        request.method == "POST"
+        and (path.startswith("/admin/") or path == "/config")
+        and path != "/admin/login"
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            key=PRIMARY_STICKY_COOKIE,
+            value="1",
+            max_age=PRIMARY_STICKY_SECONDS,
+            httponly=True,
+            samesite="lax",
+            secure=(request.url.scheme == "https"),
+            path="/",
+        )
+    return response
+
+
+# Sem réplica configurada o middleware nem é registrado (nenhum custo por requisição)
+if read_engine is not engine:
+    app.middleware("http")(route_reads)
+
+
+# Preload (cabeçalho Link e 103 Early Hints) do logo, do CSS e da foto principal da página
+def _base_preloads() -> list[dict]:
+    return [
+        {"href": "/static/img/logo.svg", "as": "image", "type": "image/svg+xml"},
+        {"href": stylesheet_url(), "as": "style"},
+    ]
+
+
+app.add_middleware(EarlyHintsMiddleware, base=_base_preloads)
+
+# Cache-Control/Surrogate-Key por rota para a CDN (app/cdn.py); o painel dispara os purges
+app.add_middleware(CDNCacheMiddleware)
+
+
+def _purge_suites(*suite_ids: int) -> None:
+    purge_queue.purge("catalogo", *(f"suite-{i}" for i in suite_ids))
+
+# Profiling sob demanda (/admin/perfis): fica por fora dos demais middlewares
+app.add_middleware(ProfileMiddleware)
+
+# Admissão: limita requisições dinâmicas simultâneas (fila curta, depois 503 + Retry-After)
+if ADMISSION_MAX_INFLIGHT > 0:
+    app.add_middleware(AdmissionMiddleware)
+
+# Limite por cliente (token bucket): fica por fora da admissão, quem abusa nem entra na fila
+if limiter is not None:
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+# Log de acesso (rota, status, latência, tempo de banco): o mais externo, mede tudo
+if ACCESS_LOG:
+    app.add_middleware(AccessLogMiddleware)
+
 # Templates Jinja
 templates_env = Environment(
     loader=FileSystemLoader("app/templates"),
     autoescape=select_autoescape(["html", "xml"]),
+    # {% cache %} para cabeçalho, rodapé e JSON-LD do base.html (app/fragments.py)
+    extensions=[FragmentCacheExtension],
 )
 
-class CachedStaticFiles(StaticFiles):
-    def __init__(
-        self,
-        *args,
-        cache_control: str = "public, max-age=2592000, immutable",
-        cache_extensions: Optional[set[str]] = None,
-        **kwargs,
-    ):
-        super().__init__(*args, **kwargs)
-        self._cache_control = cache_control
-        self._cache_extensions = cache_extensions or {
-            ".webp",
-            ".jpg",
-            ".jpeg",
-            ".png",
-            ".gif",
-            ".svg",
-            ".ico",
-        }
-
-    async def get_response(self, path: str, scope):
-        resp = await super().get_response(path, scope)
-        if getattr(resp, "status_code", None) == 200:
-            p = path.lower()
-            for ext in self._cache_extensions:
-                if p.endswith(ext):
-                    resp.headers["Cache-Control"] = self._cache_control
-                    break
-        return resp
-
 # Static
 app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
@@ -125,6 +282,75 @@ if fotos_apartamentos_web_dir.is_dir():
         CachedStaticFiles(directory=str(fotos_apartamentos_web_dir)),
         name="fotos-apartamentos-web",
     )
+# Prévia estática do mapa (fachada do Google Maps), gerada pelo painel em /config
+app.mount("/mapas", CachedStaticFiles(directory=str(MAPS_PREVIEW_DIR), check_dir=False), name="mapas")
+
+
+# ---------------------- Imagens redimensionadas sob demanda ----------------------
+# /img/600/fotos-apartamentos/x.jpg -> x.jpg com 600px de largura (WebP), gerado na primeira
+# visita numa thread de trabalho e guardado no cache em disco (LRU limitado por tamanho).
+IMG_ROOTS = {
+    "static": Path("app/static"),
+    "fotos-apartamentos": fotos_apartamentos_dir,
+    "fotos-apartamentos-web": fotos_apartamentos_web_dir,
+}
+_img_static = CachedStaticFiles(directory=str(IMG_CACHE_DIR), check_dir=False)
+_img_inflight: dict[str, asyncio.Future] = {}
+
+
+def _img_source(path: str) -> Path | None:
+    root_name, _, rel = path.partition("/")
+    root = IMG_ROOTS.get(root_name)
+    if root is None or not rel or Path(rel).suffix.lower() not in IMG_EXTS:
+        return None
+    base = root.resolve()
+    src = (base / rel).resolve()
+    if not src.is_relative_to(base) or not src.is_file():
+        return None
+    return src
+
+
+def img_url(url: str | None, width: int) -> str:
+    # URL redimensionada para fotos locais; URLs externas (ou larguras fora da lista) ficam como estão
+    if not url or not url.startswith("/") or width not in IMG_WIDTHS:
+        return url or ""
+    root_name = url[1:].partition("/")[0]
+    if root_name not in IMG_ROOTS or Path(url).suffix.lower() not in IMG_EXTS:
+        return url
+    return f"/img/{width}{url}"
+
+
+templates_env.globals["img_url"] = img_url
+templates_env.globals["stylesheet_url"] = stylesheet_url
+templates_env.globals["critical_css"] = critical_css
+
+
+@app.get("/img/{width}/{path:path}")
+async def img_resized(request: Request, width: int, path: str) -> Response:
+    if width not in IMG_WIDTHS:
+        raise HTTPException(status_code=404)
+    src = _img_source(path)
+    if src is None:
+        raise HTTPException(status_code=404)
+    st = src.stat()
+    # o nome muda se o original mudar: versões antigas saem do cache por LRU
+    name = hashlib.sha1(f"{path}|{width}|{st.st_mtime_ns}|{st.st_size}".encode("utf-8")).hexdigest() + ".webp"
+    if not img_cache.touch(name):
+        task = _img_inflight.get(name)
+        if task is None:
+            # pedidos simultâneos da mesma imagem esperam um único redimensionamento
+            task = asyncio.ensure_future(run_in_threadpool(resize_image, src, img_cache.path(name), width))
+            _img_inflight[name] = task
+            task.add_done_callback(lambda _t: _img_inflight.pop(name, None))
+        try:
+            size = await asyncio.shield(task)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+            # arquivo corrompido ou que o Pillow não lê: manda para o original, sem guardar nada
+            # no cache (o próximo pedido tenta de novo, caso o arquivo seja trocado)
+            logger.warning("falha ao redimensionar %s: %s", path, exc)
+            return RedirectResponse(url=f"/{path}", status_code=status.HTTP_302_FOUND)
+        img_cache.add(name, size)
+    return await _img_static.get_response(name, request.scope)
 
 
 @app.exception_handler(HTTPException)
@@ -136,18 +362,79 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return await fastapi_http_exception_handler(request, exc)
 
 
-def _render(template_name: str, request: Request, **ctx):
+# Páginas grandes podem ser enviadas em streaming (Template.generate): o <head> sai antes do corpo
+TEMPLATE_STREAMING = os.getenv("TEMPLATE_STREAMING", "1").lower() not in ("0", "false", "no")
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def _render_context(request: Request, ctx: dict) -> dict:
     ctx.setdefault("request", request)
     ctx.setdefault("current_user", get_current_user(request))
     ctx.setdefault("site_url", CANONICAL_SITE_URL)
     ctx.setdefault("ga4_measurement_id", os.getenv("GA4_MEASUREMENT_ID", "").strip() or None)
+    ctx.setdefault("preload", [])
+    # também vai para o cabeçalho Link (EarlyHintsMiddleware)
+    request.state.preload = ctx["preload"]
+    return ctx
+
+
+def _render(template_name: str, request: Request, **ctx):
     t = templates_env.get_template(template_name)
-    return t.render(**ctx)
+    return t.render(**_render_context(request, ctx))
+
+
+def _render_stream(template_name: str, request: Request, **ctx) -> Response:
+    if not TEMPLATE_STREAMING:
+        return HTMLResponse(_render(template_name, request, **ctx))
+    t = templates_env.get_template(template_name)
+    ctx = _render_context(request, ctx)
+
+    def render_chunks():
+        # Agrupa os pedaços do Jinja em blocos de ~16 KB, mas envia o <head> (preloads, CSS) assim que fecha
+        buf: list[str] = []
+        size = 0
+        head_sent = False
+        for piece in t.generate(**ctx):
+            buf.append(piece)
+            size += len(piece)
+            if size >= STREAM_CHUNK_SIZE or (not head_sent and "</head>" in piece):
+                head_sent = head_sent or "</head>" in piece
+                yield "".join(buf)
+                buf.clear()
+                size = 0
+        if buf:
+            yield "".join(buf)
+
+    # com /admin/perfis armado, o tempo dessa geração (no threadpool) entra no perfil
+    return StreamingResponse(profile_threads(render_chunks()), media_type="text/html; charset=utf-8")
+
+
+def _cover_map(db, suite_ids: list[int]) -> dict[int, Foto]:
+    # Uma consulta pelo índice único parcial (suite_id) WHERE capa, em vez de uma por suíte
+    if not suite_ids:
+        return {}
+    fotos = db.execute(
+        select(Foto).where(Foto.suite_id.in_(suite_ids), Foto.capa == True)  # noqa: E712
+    ).scalars().all()
+    return {f.suite_id: f for f in fotos}
+
+
+def _ensure_cover(db, suite_id: int) -> None:
+    # Toda suíte com fotos tem exatamente uma capa: promove a primeira por ordem se faltar
+    has_cover = db.execute(
+        select(Foto.id).where(Foto.suite_id == suite_id, Foto.capa == True).limit(1)  # noqa: E712
+    ).scalar_one_or_none()
+    if has_cover is None:
+        first = db.execute(
+            select(Foto).where(Foto.suite_id == suite_id).order_by(Foto.ordem.asc(), Foto.id.asc()).limit(1)
+        ).scalar_one_or_none()
+        if first is not None:
+            first.capa = True
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         suites = db.execute(
             select(Suite)
@@ -155,13 +442,8 @@ async def home(request: Request):
             .order_by(Suite.destaque.desc(), Suite.ordem.asc(), Suite.titulo.asc())
         ).scalars().all()
         suite_ids = [s.id for s in suites]
-        cover_map: dict[int, Foto | None] = {}
+        cover_map: dict[int, Foto] = _cover_map(db, suite_ids)
         amen_map: dict[int, list[str]] = {}
-        for s in suites:
-            f = db.execute(
-                select(Foto).where(Foto.suite_id == s.id).order_by(Foto.capa.desc(), Foto.ordem.asc())
-            ).scalars().first()
-            cover_map[s.id] = f
         if suite_ids:
             from .models import suite_amenidade
             rows = db.execute(
@@ -172,19 +454,19 @@ async def home(request: Request):
             ).all()
             for sid, anome in rows:
                 amen_map.setdefault(sid, []).append(anome)
-    return _render("index.html", request, site=site, suites=suites, cover_map=cover_map, amen_map=amen_map)
+    return _render_stream("index.html", request, site=site, suites=suites, cover_map=cover_map, amen_map=amen_map)
 
 
 @app.get("/sobre", response_class=HTMLResponse)
 async def sobre(request: Request):
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("sobre.html", request, site=site)
 
 
 @app.get("/contato", response_class=HTMLResponse)
 async def contato(request: Request):
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("contato.html", request, site=site)
 
@@ -193,7 +475,7 @@ async def contato(request: Request):
 async def login_get(request: Request):
     if get_current_user(request):
         return RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("login.html", request, site=site, error=None, admin_mode=False)
 
@@ -204,18 +486,21 @@ async def login_post(request: Request, username: str = Form(""), password: str =
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         user = db.execute(select(User).where(User.username == username).limit(1)).scalar_one_or_none()
     if not user or user.status != "ativo" or not verify_password(password, user.password_hash):
+        logger.warning("login recusado", extra={"event": "login_falhou", "username": username})
         return HTMLResponse(
             _render("login.html", request, site=site, error="Usuário ou senha inválidos", admin_mode=False),
             status_code=401,
         )
 
+    logger.info("login", extra={"event": "login", "username": user.username})
     resp = RedirectResponse(
         url=("/administracao" if user.role == "admin" else "/funcionarios"),
         status_code=status.HTTP_302_FOUND,
     )
     resp.set_cookie(
         key=SESSION_COOKIE_NAME,
-        value=sign_session(user.id),
+        value=sign_session(user),
+        max_age=SESSION_TTL_SECONDS,
         httponly=True,
         samesite="lax",
         secure=(request.url.scheme == "https"),
@@ -229,7 +514,7 @@ async def admin_login_get(request: Request):
     if get_current_user(request):
         return RedirectResponse(url="/administracao", status_code=status.HTTP_302_FOUND)
     admin_user = (os.getenv("ADMIN_USER") or "admin")
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render(
         "login.html",
@@ -249,6 +534,7 @@ async def admin_login_post(request: Request, password: str = Form("")):
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         user = db.execute(select(User).where(User.username == admin_user).limit(1)).scalar_one_or_none()
     if not user or user.status != "ativo" or user.role != "admin" or not verify_password(password, user.password_hash):
+        logger.warning("login admin recusado", extra={"event": "login_falhou", "username": admin_user})
         return HTMLResponse(
             _render(
                 "login.html",
@@ -262,10 +548,12 @@ async def admin_login_post(request: Request, password: str = Form("")):
             status_code=401,
         )
 
+    logger.info("login admin", extra={"event": "login", "username": user.username})
     resp = RedirectResponse(url="/administracao", status_code=status.HTTP_302_FOUND)
     resp.set_cookie(
         key=SESSION_COOKIE_NAME,
-        value=sign_session(user.id),
+        value=sign_session(user),
+        max_age=SESSION_TTL_SECONDS,
         httponly=True,
         samesite="lax",
         secure=(request.url.scheme == "https"),
@@ -305,7 +593,7 @@ async def sitemap_xml() -> Response:
         f"{CANONICAL_SITE_URL}/suites",
     ]
     try:
-        with get_session() as db:
+        with get_read_session() as db:
             slugs = (
                 db.execute(
                     select(Suite.slug).where(Suite.status == "ativo").order_by(Suite.slug.asc())
@@ -334,26 +622,201 @@ async def sitemap_xml() -> Response:
 
 
 @app.get("/funcionarios", response_class=HTMLResponse)
-async def funcionarios_dashboard(request: Request, current_user: User = Depends(require_role("funcionario", "admin"))):
+async def funcionarios_dashboard(request: Request, current_user: SessionUser = Depends(require_role("funcionario", "admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("funcionarios_dashboard.html", request, site=site, current_user=current_user)
 
 
 # ---------------------- Administração ----------------------
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+
+
+def _encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> list | None:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _keyset_page(db, stmt, keys, after: str = "", limit: int = ADMIN_PAGE_SIZE):
+    # Paginação por chave: "WHERE (k1, k2, id) > (:v1, :v2, :id) ORDER BY k1, k2, id LIMIT n+1",
+    # apoiada pelos índices compostos de models.py; custo constante em qualquer página.
+    values = _decode_cursor(after, len(keys)) if after else None
+    if values is not None:
+        stmt = stmt.where(tuple_(*keys) > tuple_(*values))
+    rows = db.execute(stmt.order_by(*[k.asc() for k in keys]).limit(limit + 1)).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor([getattr(rows[-1], k.key) for k in keys])
+    return rows, next_cursor
+
+
+def _page_urls(path: str, filters: dict, next_cursor: str | None, after: str) -> dict:
+    params = {k: v for k, v in filters.items() if v not in (None, "")}
+    qs = urlencode(params)
+    return {
+        "first_url": (path + (f"?{qs}" if qs else "")) if after else None,
+        "next_url": (path + "?" + urlencode({**params, "after": next_cursor})) if next_cursor else None,
+        "clear_url": path if params else None,
+    }
+
+
+def _int_or_none(value: str) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 
 @app.get("/administracao", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, current_user: User = Depends(require_role("admin"))):
+async def admin_dashboard(request: Request, current_user: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("admin_dashboard.html", request, site=site, current_user=current_user)
 
+# ---------------------- Admin: profiling sob demanda ----------------------
+@app.get("/admin/perfis", response_class=HTMLResponse)
+async def perfis_list(request: Request, _: SessionUser = Depends(require_role("admin"))):
+    with get_session() as db:
+        site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
+    return _render(
+        "admin_perfis.html",
+        request,
+        site=site,
+        alvo=current_target(),
+        items=list_profiles(),
+        max_requests=PROFILE_MAX_REQUESTS,
+        admissao=admission.stats() if ADMISSION_MAX_INFLIGHT > 0 else None,
+    )
+
+
+@app.get("/admin/metricas")
+async def admin_metricas(_: SessionUser = Depends(require_role("admin"))):
+    # contadores deste worker (cada worker do uvicorn tem os seus)
+    return Response(
+        content=json.dumps(
+            {
+                "pid": os.getpid(),
+                "admissao": admission.stats() if ADMISSION_MAX_INFLIGHT > 0 else None,
+                "limite": limiter.stats() if limiter is not None else None,
+                "img_cache": img_cache.stats(),
+                "fragmentos": fragment_cache.stats(),
+                "cdn": purge_queue.stats(),
+                "cliques": contact_clicks.stats(),
+            },
+            ensure_ascii=False,
+        ),
+        media_type="application/json",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.get("/admin/contatos", response_class=HTMLResponse)
+async def admin_contatos(
+    request: Request,
+    dias: int = Query(default=30, ge=1, le=365),
+    _: SessionUser = Depends(require_role("admin")),
+):
+    # o buffer deste worker vai para o banco antes; os outros gravam em até ANALYTICS_FLUSH_SECONDS
+    await run_in_threadpool(contact_clicks.flush)
+    desde = datetime.now(timezone.utc) - timedelta(days=dias)
+    dia = func.date(ContatoClique.criado_em)
+    total = func.count(ContatoClique.id)
+    with get_session() as db:
+        site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
+        por_dia = db.execute(
+            select(dia, ContatoClique.metodo, total)
+            .where(ContatoClique.criado_em >= desde)
+            .group_by(dia, ContatoClique.metodo)
+        ).all()
+        por_pagina = db.execute(
+            select(ContatoClique.pagina, ContatoClique.metodo, total)
+            .where(ContatoClique.criado_em >= desde)
+            .group_by(ContatoClique.pagina, ContatoClique.metodo)
+        ).all()
+
+    def _pivot(rows) -> list[dict]:
+        linhas: dict = {}
+        for chave, metodo, n in rows:
+            linha = linhas.setdefault(str(chave or "—"), {m: 0 for m in CONTACT_METHODS})
+            linha[metodo] = linha.get(metodo, 0) + n
+        return [{"chave": k, "total": sum(v.values()), **v} for k, v in linhas.items()]
+
+    totais = {m: 0 for m in CONTACT_METHODS}
+    for _dia, metodo, n in por_dia:
+        totais[metodo] = totais.get(metodo, 0) + n
+    return _render(
+        "admin_contatos.html",
+        request,
+        site=site,
+        dias=dias,
+        totais=totais,
+        por_dia=sorted(_pivot(por_dia), key=lambda r: r["chave"], reverse=True),
+        por_pagina=sorted(_pivot(por_pagina), key=lambda r: r["total"], reverse=True)[:20],
+    )
+
+
+@app.post("/admin/perfis")
+async def perfis_arm(
+    rota: str = Form(""),
+    quantidade: int = Form(5),
+    intervalo_ms: float = Form(5.0),
+    _: SessionUser = Depends(require_role("admin")),
+):
+    rota = rota.strip()
+    if rota.startswith("/"):
+        arm_profiler(rota, quantidade, intervalo_ms)
+        logger.info("profiler armado", extra={"event": "profiler_armado", "rota": rota, "quantidade": quantidade})
+    return RedirectResponse(url="/admin/perfis", status_code=status.HTTP_302_FOUND)
+
+
+@app.post("/admin/perfis/cancelar")
+async def perfis_disarm(_: SessionUser = Depends(require_role("admin"))):
+    disarm_profiler()
+    return RedirectResponse(url="/admin/perfis", status_code=status.HTTP_302_FOUND)
+
+
+@app.get("/admin/perfis/{nome}")
+async def perfis_detail(
+    request: Request,
+    nome: str,
+    formato: str = "",
+    _: SessionUser = Depends(require_role("admin")),
+):
+    perfil = load_profile(nome)
+    if perfil is None:
+        raise HTTPException(status_code=404)
+    if formato == "pilhas":
+        # pilhas agregadas, para abrir no speedscope ou flamegraph.pl
+        return PlainTextResponse("\n".join(perfil["pilhas"]) + "\n")
+    with get_session() as db:
+        site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
+    return _render("admin_perfil.html", request, site=site, perfil=perfil)
+
+
 @app.get("/config", response_class=HTMLResponse)
-async def config_get(request: Request, _: User = Depends(require_role("admin"))):
+async def config_get(request: Request, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     t = templates_env.get_template("config.html")
-    return t.render(request=request, site=site, current_user=get_current_user(request), site_url=CANONICAL_SITE_URL)
+    return t.render(
+        request=request,
+        site=site,
+        current_user=get_current_user(request),
+        site_url=CANONICAL_SITE_URL,
+        mapa_falhou=request.query_params.get("mapa") == "falhou",
+    )
 
 
 @app.post("/config")
@@ -366,8 +829,10 @@ async def config_post(
     email: str = Form(""),
     primaryColor: str = Form(""),
     mapsEmbedUrl: str = Form(""),
-    _: User = Depends(require_role("admin")),
+    mapsModo: str = Form(""),
+    _: SessionUser = Depends(require_role("admin")),
 ):
+    mapsModo = mapsModo if mapsModo == "fachada" else ""
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         if site is None:
@@ -380,6 +845,7 @@ async def config_post(
                 email=email or None,
                 primary_color=primaryColor or None,
                 maps_embed_url=mapsEmbedUrl or None,
+                maps_modo=mapsModo or None,
             )
             db.add(site)
         else:
@@ -391,13 +857,39 @@ async def config_post(
             site.email = email or None
             site.primary_color = primaryColor or None
             site.maps_embed_url = mapsEmbedUrl or None
+            site.maps_modo = mapsModo or None
         db.commit()
+    # os outros workers percebem pela versão (valores) da SiteConfig na chave
+    fragment_cache.clear()
+    purge_queue.purge("config")
     return RedirectResponse(url="/config", status_code=status.HTTP_302_FOUND)
 
 
+@app.post("/admin/mapa/previa")
+async def mapa_previa(_: SessionUser = Depends(require_role("admin"))):
+    with get_session() as db:
+        site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
+        # mesma consulta do rodapé (base.html): endereço da /config ou o padrão
+        endereco = (site and site.endereco) or "Rua Guarani 212, Rio Pardo RS, CEP 96640-000, Brasil"
+        nome = (site and site.nome_site) or "Motel Bela Vista"
+    previa, erro = await run_in_threadpool(generate_preview, f"Motel Bela Vista, {endereco}", nome, endereco)
+    with get_session() as db:
+        site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
+        if site is None:
+            site = SiteConfig()
+            db.add(site)
+        site.maps_preview = previa
+        db.commit()
+    fragment_cache.clear()
+    purge_queue.purge("config")
+    logger.info("prévia do mapa gerada", extra={"event": "mapa_previa", "url": previa, "erro": erro})
+    destino = "/config?mapa=falhou" if erro else "/config"
+    return RedirectResponse(url=destino, status_code=status.HTTP_302_FOUND)
+
+
 # ---------------------- Admin: Tipos de Suíte ----------------------
 @app.get("/admin/tipos", response_class=HTMLResponse)
-async def tipos_list(request: Request, _: User = Depends(require_role("admin"))):
+async def tipos_list(request: Request, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         items = db.execute(select(TipoSuite).order_by(TipoSuite.ordem.asc(), TipoSuite.nome.asc())).scalars().all()
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
@@ -405,7 +897,7 @@ async def tipos_list(request: Request, _: User = Depends(require_role("admin")))
 
 
 @app.get("/admin/tipos/novo", response_class=HTMLResponse)
-async def tipos_new(request: Request, _: User = Depends(require_role("admin"))):
+async def tipos_new(request: Request, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("admin_tipos_form.html", request, site=site, item=None)
@@ -416,17 +908,18 @@ async def tipos_create(
     nome: str = Form(""),
     descricao: str = Form(""),
     ordem: int = Form(0),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     with get_session() as db:
         item = TipoSuite(nome=nome, descricao=descricao or None, ordem=ordem or 0)
         db.add(item)
         db.commit()
+    _purge_suites()
     return RedirectResponse(url="/admin/tipos", status_code=status.HTTP_302_FOUND)
 
 
 @app.get("/admin/tipos/editar/{id}", response_class=HTMLResponse)
-async def tipos_edit(request: Request, id: int, _: User = Depends(require_role("admin"))):
+async def tipos_edit(request: Request, id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(TipoSuite, id)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
@@ -439,7 +932,7 @@ async def tipos_update(
     nome: str = Form(""),
     descricao: str = Form(""),
     ordem: int = Form(0),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     with get_session() as db:
         item = db.get(TipoSuite, id)
@@ -447,31 +940,53 @@ async def tipos_update(
             item.nome = nome
             item.descricao = descricao or None
             item.ordem = ordem or 0
+            afetadas = suite_ids_for_tipo(db, id)
+            reindex_suites(db, afetadas)
             db.commit()
+            _purge_suites(*afetadas)
     return RedirectResponse(url="/admin/tipos", status_code=status.HTTP_302_FOUND)
 
 
 @app.post("/admin/tipos/excluir/{id}")
-async def tipos_delete(id: int, _: User = Depends(require_role("admin"))):
+async def tipos_delete(id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(TipoSuite, id)
         if item:
+            afetadas = suite_ids_for_tipo(db, id)
             db.delete(item)
+            reindex_suites(db, afetadas)
             db.commit()
+            _purge_suites(*afetadas)
     return RedirectResponse(url="/admin/tipos", status_code=status.HTTP_302_FOUND)
 
 
 # ---------------------- Admin: Amenidades ----------------------
 @app.get("/admin/amenidades", response_class=HTMLResponse)
-async def amenidades_list(request: Request, _: User = Depends(require_role("admin"))):
+async def amenidades_list(
+    request: Request,
+    q: str = "",
+    after: str = "",
+    _: SessionUser = Depends(require_role("admin")),
+):
+    filters = {"q": q.strip()}
+    stmt = select(Amenidade)
+    if filters["q"]:
+        stmt = stmt.where(Amenidade.nome.icontains(filters["q"], autoescape=True))
     with get_session() as db:
-        items = db.execute(select(Amenidade).order_by(Amenidade.nome.asc())).scalars().all()
+        items, next_cursor = _keyset_page(db, stmt, [Amenidade.nome, Amenidade.id], after)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
-    return _render("admin_amenidades.html", request, site=site, items=items)
+    return _render(
+        "admin_amenidades.html",
+        request,
+        site=site,
+        items=items,
+        filters=filters,
+        **_page_urls("/admin/amenidades", filters, next_cursor, after),
+    )
 
 
 @app.get("/admin/amenidades/novo", response_class=HTMLResponse)
-async def amenidades_new(request: Request, _: User = Depends(require_role("admin"))):
+async def amenidades_new(request: Request, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("admin_amenidades_form.html", request, site=site, item=None)
@@ -481,17 +996,18 @@ async def amenidades_new(request: Request, _: User = Depends(require_role("admin
 async def amenidades_create(
     nome: str = Form(""),
     icone: str = Form(""),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     with get_session() as db:
         item = Amenidade(nome=nome, icone=icone or None)
         db.add(item)
         db.commit()
+    _purge_suites()
     return RedirectResponse(url="/admin/amenidades", status_code=status.HTTP_302_FOUND)
 
 
 @app.get("/admin/amenidades/editar/{id}", response_class=HTMLResponse)
-async def amenidades_edit(request: Request, id: int, _: User = Depends(require_role("admin"))):
+async def amenidades_edit(request: Request, id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(Amenidade, id)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
@@ -503,39 +1019,71 @@ async def amenidades_update(
     id: int,
     nome: str = Form(""),
     icone: str = Form(""),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     with get_session() as db:
         item = db.get(Amenidade, id)
         if item:
             item.nome = nome
             item.icone = icone or None
+            afetadas = suite_ids_for_amenidade(db, id)
+            reindex_suites(db, afetadas)
             db.commit()
+            _purge_suites(*afetadas)
     return RedirectResponse(url="/admin/amenidades", status_code=status.HTTP_302_FOUND)
 
 
 @app.post("/admin/amenidades/excluir/{id}")
-async def amenidades_delete(id: int, _: User = Depends(require_role("admin"))):
+async def amenidades_delete(id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(Amenidade, id)
         if item:
+            afetadas = suite_ids_for_amenidade(db, id)
             db.delete(item)
+            reindex_suites(db, afetadas)
             db.commit()
+            _purge_suites(*afetadas)
     return RedirectResponse(url="/admin/amenidades", status_code=status.HTTP_302_FOUND)
 
 
 # ---------------------- Admin: Suítes ----------------------
 @app.get("/admin/suites", response_class=HTMLResponse)
-async def suites_list(request: Request, _: User = Depends(require_role("admin"))):
+async def suites_list(
+    request: Request,
+    q: str = "",
+    tipo_id: str = "",
+    status_val: str = "",
+    destaque: str = "",
+    after: str = "",
+    _: SessionUser = Depends(require_role("admin")),
+):
+    filters = {"q": q.strip(), "tipo_id": tipo_id, "status_val": status_val, "destaque": destaque}
+    stmt = select(Suite).options(selectinload(Suite.tipo))
+    if filters["q"]:
+        stmt = stmt.where(Suite.titulo.icontains(filters["q"], autoescape=True))
+    if _int_or_none(tipo_id) is not None:
+        stmt = stmt.where(Suite.tipo_id == _int_or_none(tipo_id))
+    if status_val in ("ativo", "inativo"):
+        stmt = stmt.where(Suite.status == status_val)
+    if destaque in ("sim", "nao"):
+        stmt = stmt.where(Suite.destaque.is_(destaque == "sim"))
     with get_session() as db:
-        items = db.execute(select(Suite).options(selectinload(Suite.tipo)).order_by(Suite.ordem.asc(), Suite.titulo.asc())).scalars().all()
+        items, next_cursor = _keyset_page(db, stmt, [Suite.ordem, Suite.titulo, Suite.id], after)
         tipos = db.execute(select(TipoSuite).order_by(TipoSuite.nome.asc())).scalars().all()
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
-    return _render("admin_suites.html", request, site=site, items=items, tipos=tipos)
+    return _render(
+        "admin_suites.html",
+        request,
+        site=site,
+        items=items,
+        tipos=tipos,
+        filters=filters,
+        **_page_urls("/admin/suites", filters, next_cursor, after),
+    )
 
 
 @app.get("/admin/suites/novo", response_class=HTMLResponse)
-async def suites_new(request: Request, _: User = Depends(require_role("admin"))):
+async def suites_new(request: Request, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         tipos = db.execute(select(TipoSuite).order_by(TipoSuite.nome.asc())).scalars().all()
         amenidades = db.execute(select(Amenidade).order_by(Amenidade.nome.asc())).scalars().all()
@@ -554,7 +1102,7 @@ async def suites_create(
     destaque: str = Form(""),
     ordem: int = Form(0),
     amenidades_ids: List[int] = Form(default=[]),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     with get_session() as db:
         s = Suite(
@@ -570,12 +1118,15 @@ async def suites_create(
         if amenidades_ids:
             s.amenidades = db.execute(select(Amenidade).where(Amenidade.id.in_(amenidades_ids))).scalars().all()
         db.add(s)
+        db.flush()
+        reindex_suites(db, [s.id])
         db.commit()
+        _purge_suites(s.id)
     return RedirectResponse(url="/admin/suites", status_code=status.HTTP_302_FOUND)
 
 
 @app.get("/admin/suites/editar/{id}", response_class=HTMLResponse)
-async def suites_edit(request: Request, id: int, _: User = Depends(require_role("admin"))):
+async def suites_edit(request: Request, id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(Suite, id)
         tipos = db.execute(select(TipoSuite).order_by(TipoSuite.nome.asc())).scalars().all()
@@ -596,7 +1147,7 @@ async def suites_update(
     destaque: str = Form(""),
     ordem: int = Form(0),
     amenidades_ids: List[int] = Form(default=[]),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     with get_session() as db:
         s = db.get(Suite, id)
@@ -611,28 +1162,50 @@ async def suites_update(
             s.ordem = ordem or 0
             if amenidades_ids is not None:
                 s.amenidades = db.execute(select(Amenidade).where(Amenidade.id.in_(amenidades_ids))).scalars().all()
+            reindex_suites(db, [s.id])
             db.commit()
+            _purge_suites(s.id)
     return RedirectResponse(url="/admin/suites", status_code=status.HTTP_302_FOUND)
 
 
 @app.post("/admin/suites/excluir/{id}")
-async def suites_delete(id: int, _: User = Depends(require_role("admin"))):
+async def suites_delete(id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         s = db.get(Suite, id)
         if s:
             db.delete(s)
+            remove_suites(db, [id])
             db.commit()
+            _purge_suites(id)
     return RedirectResponse(url="/admin/suites", status_code=status.HTTP_302_FOUND)
 
 
 # ---------------------- Admin: Fotos ----------------------
 @app.get("/admin/suites/{suite_id}/fotos", response_class=HTMLResponse)
-async def fotos_list(request: Request, suite_id: int, _: User = Depends(require_role("admin"))):
+async def fotos_list(
+    request: Request,
+    suite_id: int,
+    q: str = "",
+    after: str = "",
+    _: SessionUser = Depends(require_role("admin")),
+):
+    filters = {"q": q.strip()}
+    stmt = select(Foto).where(Foto.suite_id == suite_id)
+    if filters["q"]:
+        stmt = stmt.where(Foto.legenda.icontains(filters["q"], autoescape=True))
     with get_session() as db:
         suite = db.get(Suite, suite_id)
-        fotos = db.execute(select(Foto).where(Foto.suite_id == suite_id).order_by(Foto.ordem.asc())).scalars().all()
+        fotos, next_cursor = _keyset_page(db, stmt, [Foto.ordem, Foto.id], after)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
-    return _render("admin_fotos.html", request, site=site, suite=suite, fotos=fotos)
+    return _render(
+        "admin_fotos.html",
+        request,
+        site=site,
+        suite=suite,
+        fotos=fotos,
+        filters=filters,
+        **_page_urls(f"/admin/suites/{suite_id}/fotos", filters, next_cursor, after),
+    )
 
 
 @app.post("/admin/suites/{suite_id}/fotos/novo")
@@ -642,42 +1215,116 @@ async def fotos_create(
     legenda: str = Form(""),
     ordem: int = Form(0),
     capa: str = Form(""),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
+    # foto local: dimensões, cor e miniatura para o placeholder (layout estável antes da imagem)
+    meta = {}
+    src = _img_source(url[1:]) if url.startswith("/") else None
+    if src is not None:
+        try:
+            meta = await run_in_threadpool(placeholder, src)
+        except OSError:
+            meta = {}
     with get_session() as db:
+        if capa == "on":
+            db.execute(update(Foto).where(Foto.suite_id == suite_id).values(capa=False))
         f = Foto(
             suite_id=suite_id,
             url=url,
             legenda=legenda or None,
             ordem=ordem or 0,
             capa=True if (capa == "on") else False,
+            largura=meta.get("w"),
+            altura=meta.get("h"),
+            cor=meta.get("cor"),
+            lqip=meta.get("lqip"),
         )
         db.add(f)
+        db.flush()
+        _ensure_cover(db, suite_id)
         db.commit()
+    _purge_suites(suite_id)
+    return RedirectResponse(url=f"/admin/suites/{suite_id}/fotos", status_code=status.HTTP_302_FOUND)
+
+
+@app.post("/admin/suites/{suite_id}/fotos/ordem")
+async def fotos_reorder(
+    suite_id: int,
+    foto_ids: List[int] = Form(default=[]),
+    ordens: List[int] = Form(default=[]),
+    capa_id: Optional[int] = Form(None),
+    _: SessionUser = Depends(require_role("admin")),
+):
+    # Reordena e define a capa de todas as fotos enviadas numa única transação
+    if len(foto_ids) != len(ordens):
+        raise HTTPException(status_code=400, detail="foto_ids e ordens devem ter o mesmo tamanho")
+    with get_session() as db:
+        ids = set(
+            db.execute(select(Foto.id).where(Foto.suite_id == suite_id, Foto.id.in_(foto_ids))).scalars().all()
+        )
+        if ids != set(foto_ids) or (capa_id is not None and capa_id not in ids):
+            raise HTTPException(status_code=400, detail="Foto não pertence a esta suíte")
+        if capa_id is not None:
+            # desmarca antes de marcar: o índice único parcial não admite duas capas nem durante o lote
+            db.execute(
+                update(Foto).where(Foto.suite_id == suite_id, Foto.id != capa_id).values(capa=False)
+            )
+        if foto_ids:
+            db.execute(update(Foto), [{"id": fid, "ordem": o} for fid, o in zip(foto_ids, ordens)])
+        if capa_id is not None:
+            db.execute(update(Foto).where(Foto.id == capa_id).values(capa=True))
+        db.commit()
+    _purge_suites(suite_id)
     return RedirectResponse(url=f"/admin/suites/{suite_id}/fotos", status_code=status.HTTP_302_FOUND)
 
 
 @app.post("/admin/fotos/excluir/{id}")
-async def fotos_delete(id: int, _: User = Depends(require_role("admin"))):
+async def fotos_delete(id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         f = db.get(Foto, id)
         suite_id = f.suite_id if f else None
         if f:
             db.delete(f)
+            db.flush()
+            _ensure_cover(db, suite_id)
             db.commit()
+            _purge_suites(suite_id)
     return RedirectResponse(url=f"/admin/suites/{suite_id}/fotos", status_code=status.HTTP_302_FOUND)
 
 
 @app.get("/admin/usuarios", response_class=HTMLResponse)
-async def users_list(request: Request, current_user: User = Depends(require_role("admin"))):
+async def users_list(
+    request: Request,
+    q: str = "",
+    role: str = "",
+    status_val: str = "",
+    after: str = "",
+    current_user: SessionUser = Depends(require_role("admin")),
+):
+    filters = {"q": q.strip(), "role": role, "status_val": status_val}
+    stmt = select(User)
+    if filters["q"]:
+        stmt = stmt.where(User.username.icontains(filters["q"], autoescape=True))
+    if role in ("admin", "funcionario"):
+        stmt = stmt.where(User.role == role)
+    if status_val in ("ativo", "inativo"):
+        stmt = stmt.where(User.status == status_val)
     with get_session() as db:
-        items = db.execute(select(User).order_by(User.role.asc(), User.username.asc())).scalars().all()
+        items, next_cursor = _keyset_page(db, stmt, [User.role, User.username, User.id], after)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
-    return _render("admin_usuarios.html", request, site=site, current_user=current_user, items=items)
+    return _render(
+        "admin_usuarios.html",
+        request,
+        site=site,
+        current_user=current_user,
+        items=items,
+        filters=filters,
+        **_page_urls("/admin/usuarios", filters, next_cursor, after),
+    )
 
 
 @app.get("/admin/usuarios/novo", response_class=HTMLResponse)
-async def users_new(request: Request, current_user: User = Depends(require_role("admin"))):
+async def users_new(request: Request, current_user: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("admin_usuarios_form.html", request, site=site, current_user=current_user, item=None)
@@ -690,7 +1337,7 @@ async def users_create(
     password: str = Form(""),
     role: str = Form("funcionario"),
     status_val: str = Form("ativo"),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     if role not in ("admin", "funcionario"):
         role = "funcionario"
@@ -705,11 +1352,12 @@ async def users_create(
         u = User(username=username, password_hash=hash_password(password), role=role, status=status_val)
         db.add(u)
         db.commit()
+    refresh_session_state()
     return RedirectResponse(url="/admin/usuarios", status_code=status.HTTP_302_FOUND)
 
 
 @app.get("/admin/usuarios/editar/{id}", response_class=HTMLResponse)
-async def users_edit(request: Request, id: int, current_user: User = Depends(require_role("admin"))):
+async def users_edit(request: Request, id: int, current_user: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(User, id)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
@@ -723,7 +1371,7 @@ async def users_update(
     password: str = Form(""),
     role: str = Form("funcionario"),
     status_val: str = Form("ativo"),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     if role not in ("admin", "funcionario"):
         role = "funcionario"
@@ -732,6 +1380,9 @@ async def users_update(
     with get_session() as db:
         item = db.get(User, id)
         if item:
+            # qualquer mudança que afete a sessão revoga os tokens emitidos antes dela
+            if (username and username != item.username) or role != item.role or status_val != item.status or password:
+                item.session_version = (item.session_version or 1) + 1
             if username:
                 item.username = username
             item.role = role
@@ -739,16 +1390,18 @@ async def users_update(
             if password:
                 item.password_hash = hash_password(password)
             db.commit()
+    refresh_session_state()
     return RedirectResponse(url="/admin/usuarios", status_code=status.HTTP_302_FOUND)
 
 
 @app.post("/admin/usuarios/excluir/{id}")
-async def users_delete(id: int, _: User = Depends(require_role("admin"))):
+async def users_delete(id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(User, id)
         if item:
             db.delete(item)
             db.commit()
+    refresh_session_state()
     return RedirectResponse(url="/admin/usuarios", status_code=status.HTTP_302_FOUND)
 
 
@@ -762,17 +1415,25 @@ def slugify(text: str) -> str:
 
 # ---------------------- Público: Suítes ----------------------
 @app.get("/suites", response_class=HTMLResponse)
-async def suites_public_list(request: Request):
-    with get_session() as db:
+async def suites_public_list(request: Request, q: str = ""):
+    q = q.strip()
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         tipos = db.execute(select(TipoSuite).order_by(TipoSuite.ordem.asc(), TipoSuite.nome.asc())).scalars().all()
-        suites = db.execute(select(Suite).options(selectinload(Suite.tipo)).order_by(Suite.ordem.asc(), Suite.titulo.asc())).scalars().all()
-    return _render("suites.html", request, site=site, tipos=tipos, suites=suites)
+        if q:
+            # resultados da busca na ordem de relevância
+            ids = search_suites(db, q, limit=100)
+            found = db.execute(select(Suite).options(selectinload(Suite.tipo)).where(Suite.id.in_(ids))).scalars().all()
+            by_id = {s.id: s for s in found}
+            suites = [by_id[i] for i in ids if i in by_id]
+        else:
+            suites = db.execute(select(Suite).options(selectinload(Suite.tipo)).order_by(Suite.ordem.asc(), Suite.titulo.asc())).scalars().all()
+    return _render_stream("suites.html", request, site=site, tipos=tipos, suites=suites, q=q)
 
 
 @app.get("/suites/{slug}", response_class=HTMLResponse)
 async def suite_public_detail(request: Request, slug: str):
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         suite = db.execute(
             select(Suite)
@@ -784,13 +1445,277 @@ async def suite_public_detail(request: Request, slug: str):
             fotos = db.execute(
                 select(Foto).where(Foto.suite_id == suite.id).order_by(Foto.capa.desc(), Foto.ordem.asc())
             ).scalars().all()
-    return _render("suite_detail.html", request, site=site, suite=suite, fotos=fotos)
+    # a capa (primeira da galeria) é a maior imagem acima da dobra
+    preload = [{"href": img_url(fotos[0].url, 600), "as": "image"}] if fotos else []
+    # etiqueta da CDN: editar esta suíte descarta a página; "não encontrada" cai ao criar qualquer uma
+    request.state.surrogate_keys = [f"suite-{suite.id}"] if suite else ["catalogo"]
+    return _render("suite_detail.html", request, site=site, suite=suite, fotos=fotos, preload=preload)
+
+
+# ---------------------- Eventos (beacon) ----------------------
+EVENTOS_MAX_BYTES = 1024
+
+
+@app.post("/api/eventos", status_code=status.HTTP_204_NO_CONTENT)
+async def api_eventos(request: Request) -> Response:
+    # navigator.sendBeacon (text/plain, sem preflight): {"m": "whatsapp"|"phone", "p": "/caminho"}
+    body = await request.body()
+    if len(body) > EVENTOS_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Evento grande demais")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="JSON inválido")
+    if not isinstance(data, dict) or data.get("m") not in CONTACT_METHODS:
+        raise HTTPException(status_code=400, detail="Evento desconhecido")
+    pagina = data.get("p")
+    pagina = pagina[:200] if isinstance(pagina, str) and pagina.startswith("/") else None
+    contact_clicks.add(data["m"], pagina)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ---------------------- API pública: catálogo ----------------------
+API_VERSION = 1
+API_MAX_LIMIT = 100
+API_SEARCH_LIMIT = 500
+API_SUITE_FIELDS = (
+    "id",
+    "slug",
+    "titulo",
+    "tipo",
+    "descricao",
+    "preco_hora",
+    "preco_pernoite",
+    "destaque",
+    "ordem",
+    "amenidades",
+    "capa",
+    "url",
+)
+API_SUITE_SORTS = {
+    "ordem": (Suite.destaque.desc(), Suite.ordem.asc(), Suite.titulo.asc()),
+    "titulo": (Suite.titulo.asc(),),
+    "-titulo": (Suite.titulo.desc(),),
+    "preco_hora": (Suite.preco_hora.asc(),),
+    "-preco_hora": (Suite.preco_hora.desc(),),
+    "preco_pernoite": (Suite.preco_pernoite.asc(),),
+    "-preco_pernoite": (Suite.preco_pernoite.desc(),),
+}
+
+
+def _json_response(request: Request, payload, cache_control: str = "public, max-age=60") -> Response:
+    # ETag pelo conteúdo: clientes e proxies revalidam com If-None-Match e recebem 304 sem corpo.
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = 'W/"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Access-Control-Allow-Origin": "*",
+    }
+    inm = request.headers.get("if-none-match") or ""
+    if etag in {t.strip() for t in inm.split(",")} or inm.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _price_json(value) -> float | None:
+    return float(value) if value is not None else None
+
+
+@app.get("/api/suites")
+@app.get("/api/v1/suites")
+async def api_suites(
+    request: Request,
+    q: str = "",
+    tipo: List[int] = Query(default=[]),
+    amenidade: List[int] = Query(default=[]),
+    preco_hora_min: Optional[float] = None,
+    preco_hora_max: Optional[float] = None,
+    preco_pernoite_min: Optional[float] = None,
+    preco_pernoite_max: Optional[float] = None,
+    sort: str = "",
+    fields: str = "",
+    limit: int = Query(default=50, ge=1, le=API_MAX_LIMIT),
+    offset: int = Query(default=0, ge=0),
+):
+    q = q.strip()
+    sort = sort or ("relevancia" if q else "ordem")
+    if sort not in API_SUITE_SORTS and not (sort == "relevancia" and q):
+        raise HTTPException(status_code=400, detail=f"sort inválido; use um de: {', '.join(API_SUITE_SORTS)}")
+    selected = [f.strip() for f in fields.split(",") if f.strip()] or list(API_SUITE_FIELDS)
+    unknown = [f for f in selected if f not in API_SUITE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"campos inválidos: {', '.join(unknown)}")
+
+    conds = [Suite.status == "ativo"]
+    if tipo:
+        conds.append(Suite.tipo_id.in_(tipo))
+    if amenidade:
+        # suítes que têm TODAS as amenidades pedidas
+        ids = set(amenidade)
+        conds.append(
+            Suite.id.in_(
+                select(suite_amenidade.c.suite_id)
+                .where(suite_amenidade.c.amenidade_id.in_(ids))
+                .group_by(suite_amenidade.c.suite_id)
+                .having(func.count(func.distinct(suite_amenidade.c.amenidade_id)) == len(ids))
+            )
+        )
+    if preco_hora_min is not None:
+        conds.append(Suite.preco_hora >= preco_hora_min)
+    if preco_hora_max is not None:
+        conds.append(Suite.preco_hora <= preco_hora_max)
+    if preco_pernoite_min is not None:
+        conds.append(Suite.preco_pernoite >= preco_pernoite_min)
+    if preco_pernoite_max is not None:
+        conds.append(Suite.preco_pernoite <= preco_pernoite_max)
+
+    with get_read_session() as db:
+        order_by = API_SUITE_SORTS.get(sort, ())
+        if q:
+            ids = search_suites(db, q, limit=API_SEARCH_LIMIT)
+            conds.append(Suite.id.in_(ids))
+            if sort == "relevancia" and ids:
+                order_by = (case({sid: pos for pos, sid in enumerate(ids)}, value=Suite.id),)
+        total = db.execute(select(func.count(Suite.id)).where(*conds)).scalar_one()
+        stmt = select(Suite).where(*conds).order_by(*order_by, Suite.id.asc()).limit(limit).offset(offset)
+        if "tipo" in selected:
+            stmt = stmt.options(selectinload(Suite.tipo))
+        suites = db.execute(stmt).scalars().all()
+        suite_ids = [s.id for s in suites]
+
+        amen_map: dict[int, list[dict]] = {}
+        if "amenidades" in selected and suite_ids:
+            rows = db.execute(
+                select(suite_amenidade.c.suite_id, Amenidade.id, Amenidade.nome)
+                .join(Amenidade, Amenidade.id == suite_amenidade.c.amenidade_id)
+                .where(suite_amenidade.c.suite_id.in_(suite_ids))
+                .order_by(Amenidade.nome.asc())
+            ).all()
+            for sid, aid, anome in rows:
+                amen_map.setdefault(sid, []).append({"id": aid, "nome": anome})
+
+        cover_map = _cover_map(db, suite_ids) if "capa" in selected else {}
+
+        items = []
+        for s in suites:
+            full = {
+                "id": s.id,
+                "slug": s.slug,
+                "titulo": s.titulo,
+                "tipo": ({"id": s.tipo.id, "nome": s.tipo.nome} if s.tipo else None) if "tipo" in selected else None,
+                "descricao": s.descricao,
+                "preco_hora": _price_json(s.preco_hora),
+                "preco_pernoite": _price_json(s.preco_pernoite),
+                "destaque": bool(s.destaque),
+                "ordem": s.ordem,
+                "amenidades": amen_map.get(s.id, []),
+                "capa": cover_map[s.id].url if s.id in cover_map else None,
+                "url": f"{CANONICAL_SITE_URL}/suites/{s.slug}",
+            }
+            items.append({f: full[f] for f in selected})
+
+    return _json_response(
+        request,
+        {"version": API_VERSION, "total": total, "limit": limit, "offset": offset, "items": items},
+    )
 
 
 # ---------------------- Público: Quartos (com painéis) ----------------------
+GALERIA_PAGE_SIZE = int(os.getenv("GALERIA_PAGE_SIZE", "24"))
+_galeria_cache: dict[tuple, list[dict]] = {}
+
+
+def _galeria_seed() -> str:
+    # A ordem da galeria muda uma vez por dia
+    return date.today().isoformat()
+
+
+def _galeria_fotos() -> tuple[tuple, list[dict]]:
+    # Lista as fotos da pasta uma vez e reaproveita enquanto o mtime do diretório não mudar
+    if fotos_apartamentos_web_dir.is_dir():
+        base_dir, web = fotos_apartamentos_web_dir, True
+    elif fotos_apartamentos_dir.is_dir():
+        base_dir, web = fotos_apartamentos_dir, False
+    else:
+        return ("", 0), []
+    key = (str(base_dir), base_dir.stat().st_mtime_ns)
+    cached = _galeria_cache.get(key)
+    if cached is not None:
+        return key, cached
+
+    fotos: list[dict] = []
+    if web:
+        # dimensões, cor dominante e LQIP gravados pelo otimizador (scripts/optimize_apartment_photos.py)
+        meta: dict[str, dict] = {}
+        try:
+            manifest = json.loads((base_dir / "manifest.json").read_text(encoding="utf-8"))
+            for entry in manifest.get("fotos", {}).values():
+                for name, dims in entry.get("variantes", {}).items():
+                    meta[name] = {**dims, "cor": entry.get("cor"), "lqip": entry.get("lqip")}
+        except (OSError, ValueError, AttributeError):
+            pass
+        exts = {".webp", ".jpg", ".jpeg", ".png", ".gif"}
+        for p in sorted(base_dir.iterdir()):
+            if not (p.is_file() and p.suffix.lower() in exts):
+                continue
+            if p.suffix.lower() == ".webp" and p.stem.endswith("-600"):
+                continue
+
+            src = f"/fotos-apartamentos-web/{p.name}"
+            thumb_path = p.with_name(f"{p.stem}-600{p.suffix}")
+            thumb = (
+                f"/fotos-apartamentos-web/{thumb_path.name}"
+                if thumb_path.exists()
+                else src
+            )
+
+            srcset = f"{thumb} 600w, {src} 1600w" if thumb != src else f"{src} 1600w"
+            foto = {"src": src, "thumb": thumb, "srcset": srcset}
+            m = meta.get(thumb_path.name if thumb != src else p.name)
+            if m:
+                foto.update(w=m["w"], h=m["h"], cor=m["cor"], lqip=m["lqip"])
+            fotos.append(foto)
+    else:
+        exts = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+        for p in sorted(base_dir.iterdir()):
+            if p.is_file() and p.suffix.lower() in exts:
+                src = f"/fotos-apartamentos/{p.name}"
+                fotos.append({"src": src, "thumb": src, "srcset": src})
+    _galeria_cache.clear()
+    _galeria_cache[key] = fotos
+    return key, fotos
+
+
+_galeria_ordem_cache: dict[tuple, list[dict]] = {}
+
+
+def _galeria_seeds_recentes() -> set[str]:
+    # ontem, hoje e amanhã: links "next" da véspera e relógios de outro fuso
+    hoje = date.today()
+    return {(hoje + timedelta(days=d)).isoformat() for d in (-1, 0, 1)}
+
+
+def _galeria_ordenada(seed: str) -> list[dict]:
+    key, fotos = _galeria_fotos()
+    cache_key = (key, seed)
+    ordered = _galeria_ordem_cache.get(cache_key)
+    if ordered is None:
+        ordered = list(fotos)
+        random.Random(seed).shuffle(ordered)
+        # qualquer data vale como semente, mas só as recentes entram no cache: sementes
+        # escolhidas pelo cliente não tiram a do dia de lá
+        if seed not in _galeria_seeds_recentes():
+            return ordered
+        if len(_galeria_ordem_cache) >= 4:
+            _galeria_ordem_cache.clear()
+        _galeria_ordem_cache[cache_key] = ordered
+    return ordered
+
+
 @app.get("/apartamentos", response_class=HTMLResponse)
 async def apartamentos_public_list(request: Request):
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         suites = db.execute(
             select(Suite)
@@ -798,13 +1723,8 @@ async def apartamentos_public_list(request: Request):
             .order_by(Suite.destaque.desc(), Suite.ordem.asc(), Suite.titulo.asc())
         ).scalars().all()
         suite_ids = [s.id for s in suites]
-        cover_map: dict[int, Foto | None] = {}
+        cover_map: dict[int, Foto] = _cover_map(db, suite_ids)
         amen_map: dict[int, list[str]] = {}
-        for s in suites:
-            f = db.execute(
-                select(Foto).where(Foto.suite_id == s.id).order_by(Foto.capa.desc(), Foto.ordem.asc())
-            ).scalars().first()
-            cover_map[s.id] = f
         if suite_ids:
             # coletar amenidades por suíte
             from .models import suite_amenidade
@@ -817,43 +1737,53 @@ async def apartamentos_public_list(request: Request):
             for sid, anome in rows:
                 amen_map.setdefault(sid, []).append(anome)
 
-        fotos_apartamentos: list[dict[str, str]] = []
-
-        if fotos_apartamentos_web_dir.exists() and fotos_apartamentos_web_dir.is_dir():
-            exts = {".webp", ".jpg", ".jpeg", ".png", ".gif"}
-            for p in fotos_apartamentos_web_dir.iterdir():
-                if not (p.is_file() and p.suffix.lower() in exts):
-                    continue
-                if p.suffix.lower() == ".webp" and p.stem.endswith("-600"):
-                    continue
-
-                src = f"/fotos-apartamentos-web/{p.name}"
-                thumb_path = p.with_name(f"{p.stem}-600{p.suffix}")
-                thumb = (
-                    f"/fotos-apartamentos-web/{thumb_path.name}"
-                    if thumb_path.exists()
-                    else src
-                )
+    seed = _galeria_seed()
+    fotos_apartamentos = _galeria_ordenada(seed)
 
-                srcset = f"{thumb} 600w, {src} 1600w" if thumb != src else f"{src} 1600w"
-                fotos_apartamentos.append({"src": src, "thumb": thumb, "srcset": srcset})
-        elif fotos_apartamentos_dir.exists() and fotos_apartamentos_dir.is_dir():
-            exts = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-            for p in fotos_apartamentos_dir.iterdir():
-                if p.is_file() and p.suffix.lower() in exts:
-                    src = f"/fotos-apartamentos/{p.name}"
-                    fotos_apartamentos.append({"src": src, "thumb": src, "srcset": src})
-        random.shuffle(fotos_apartamentos)
-
-        return _render(
-            "quartos.html",
-            request,
-            site=site,
-            suites=suites,
-            cover_map=cover_map,
-            amen_map=amen_map,
-            fotos_apartamentos=fotos_apartamentos,
-        )
+    # renderizado após fechar a sessão: o template só usa atributos já carregados
+    return _render_stream(
+        "quartos.html",
+        request,
+        site=site,
+        suites=suites,
+        cover_map=cover_map,
+        amen_map=amen_map,
+        fotos_apartamentos=fotos_apartamentos[:GALERIA_PAGE_SIZE],
+        galeria_total=len(fotos_apartamentos),
+        galeria_next=(
+            f"/api/v1/galeria?page=2&seed={seed}" if len(fotos_apartamentos) > GALERIA_PAGE_SIZE else None
+        ),
+    )
+
+
+@app.get("/api/galeria")
+@app.get("/api/v1/galeria")
+async def api_galeria(
+    request: Request,
+    page: int = Query(default=1, ge=1),
+    seed: str = "",
+):
+    # A ordem depende só da semente (um dia ISO) e do conteúdo da pasta: cada página é cacheável
+    try:
+        seed = date.fromisoformat(seed).isoformat() if seed else _galeria_seed()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="seed deve ser uma data AAAA-MM-DD")
+    fotos = _galeria_ordenada(seed)
+    pages = max(1, -(-len(fotos) // GALERIA_PAGE_SIZE))
+    start = (page - 1) * GALERIA_PAGE_SIZE
+    return _json_response(
+        request,
+        {
+            "version": API_VERSION,
+            "seed": seed,
+            "page": page,
+            "pages": pages,
+            "total": len(fotos),
+            "items": fotos[start:start + GALERIA_PAGE_SIZE],
+            "next": f"/api/v1/galeria?page={page + 1}&seed={seed}" if page < pages else None,
+        },
+        cache_control="public, max-age=3600",
+    )
 
 
 @app.get("/quartos")
@@ -863,7 +1793,7 @@ async def quartos_redirect() -> Response:
 
 @app.get("/motel-em-rio-pardo", response_class=HTMLResponse)
 async def seo_motel_em_rio_pardo(request: Request):
-    with get_session() as db:
+    with get_read_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
         suites = (
             db.execute(
@@ -886,15 +1816,34 @@ async def seo_motel_em_rio_pardo(request: Request):
 
 # ---------------------- Admin: Funcionários ----------------------
 @app.get("/admin/funcionarios", response_class=HTMLResponse)
-async def funcionarios_list(request: Request, _: User = Depends(require_role("admin"))):
+async def funcionarios_list(
+    request: Request,
+    q: str = "",
+    status_val: str = "",
+    after: str = "",
+    _: SessionUser = Depends(require_role("admin")),
+):
+    filters = {"q": q.strip(), "status_val": status_val}
+    stmt = select(Funcionario)
+    if filters["q"]:
+        stmt = stmt.where(Funcionario.nome.icontains(filters["q"], autoescape=True))
+    if status_val in ("ativo", "inativo"):
+        stmt = stmt.where(Funcionario.status == status_val)
     with get_session() as db:
-        items = db.execute(select(Funcionario).order_by(Funcionario.ordem.asc(), Funcionario.nome.asc())).scalars().all()
+        items, next_cursor = _keyset_page(db, stmt, [Funcionario.ordem, Funcionario.nome, Funcionario.id], after)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
-    return _render("admin_funcionarios.html", request, site=site, items=items)
+    return _render(
+        "admin_funcionarios.html",
+        request,
+        site=site,
+        items=items,
+        filters=filters,
+        **_page_urls("/admin/funcionarios", filters, next_cursor, after),
+    )
 
 
 @app.get("/admin/funcionarios/novo", response_class=HTMLResponse)
-async def funcionarios_new(request: Request, _: User = Depends(require_role("admin"))):
+async def funcionarios_new(request: Request, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
     return _render("admin_funcionarios_form.html", request, site=site, item=None)
@@ -909,7 +1858,7 @@ async def funcionarios_create(
     email: str = Form(""),
     status_val: str = Form("ativo"),
     ordem: int = Form(0),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     if status_val not in ("ativo", "inativo"):
         status_val = "ativo"
@@ -929,7 +1878,7 @@ async def funcionarios_create(
 
 
 @app.get("/admin/funcionarios/editar/{id}", response_class=HTMLResponse)
-async def funcionarios_edit(request: Request, id: int, _: User = Depends(require_role("admin"))):
+async def funcionarios_edit(request: Request, id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(Funcionario, id)
         site = db.execute(select(SiteConfig).limit(1)).scalar_one_or_none()
@@ -946,7 +1895,7 @@ async def funcionarios_update(
     email: str = Form(""),
     status_val: str = Form("ativo"),
     ordem: int = Form(0),
-    _: User = Depends(require_role("admin")),
+    _: SessionUser = Depends(require_role("admin")),
 ):
     if status_val not in ("ativo", "inativo"):
         status_val = "ativo"
@@ -965,7 +1914,7 @@ async def funcionarios_update(
 
 
 @app.post("/admin/funcionarios/excluir/{id}")
-async def funcionarios_delete(id: int, _: User = Depends(require_role("admin"))):
+async def funcionarios_delete(id: int, _: SessionUser = Depends(require_role("admin"))):
     with get_session() as db:
         item = db.get(Funcionario, id)
         if item:
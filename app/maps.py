@@ -0,0 +1,108 @@
+import hashlib
+import io
+import logging
+import os
+import textwrap
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont, UnidentifiedImageError
+
+from .search import fold
+
+# Fachada do Google Maps: no lugar do iframe (megabytes de JS de terceiros em toda página) vai
+# uma imagem estática do mapa; o iframe só carrega quando o visitante clica. A imagem é gerada
+# pelo painel (/config) e fica em MAPS_PREVIEW_DIR, servida em /mapas com nome pelo conteúdo
+# (imutável). Com GOOGLE_MAPS_STATIC_KEY é o mapa de verdade (Static Maps, baixado uma vez);
+# sem chave (ou se a API falhar), uma imagem neutra local: pino, nome, endereço e "Ver mapa".
+MAPS_PREVIEW_DIR = Path(os.getenv("MAPS_PREVIEW_DIR", "mapas"))
+MAPS_STATIC_KEY = os.getenv("GOOGLE_MAPS_STATIC_KEY", "").strip()
+MAPS_PREVIEW_SIZE = (1000, 500)
+MAPS_KEEP = 3  # prévias anteriores ficam para HTML ainda em cache (CDN)
+MAPS_QUALITY = 80
+
+logger = logging.getLogger("belavista.maps")
+
+
+def _static_map(query: str) -> Image.Image:
+    w, h = MAPS_PREVIEW_SIZE
+    params = urllib.parse.urlencode({
+        "center": query,
+        "markers": query,
+        "zoom": "16",
+        "size": f"{w // 2}x{h // 2}",
+        "scale": "2",
+        "key": MAPS_STATIC_KEY,
+    })
+    with urllib.request.urlopen(f"https://maps.googleapis.com/maps/api/staticmap?{params}", timeout=15) as resp:
+        return Image.open(io.BytesIO(resp.read())).convert("RGB")
+
+
+def _font(size: int):
+    # DejaVu quando o sistema tem (acentos); a fonte embutida do Pillow não tem "ç", "ã"...
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size), True
+    except OSError:
+        return ImageFont.load_default(size=size), False
+
+
+def _placeholder(nome: str, endereco: str) -> Image.Image:
+    # Sem ruas inventadas: um cartão neutro com o pino e o endereço escrito
+    w, h = MAPS_PREVIEW_SIZE
+    im = Image.new("RGB", (w, h), "#eceff1")
+    d = ImageDraw.Draw(im)
+    cx = w // 2
+    d.ellipse([cx - 26, 70, cx + 26, 122], fill="#d93025")
+    d.polygon([(cx - 22, 106), (cx + 22, 106), (cx, 150)], fill="#d93025")
+    d.ellipse([cx - 9, 87, cx + 9, 105], fill="#ffffff")
+
+    def centered(y: int, text: str, font, fill: str) -> int:
+        box = d.textbbox((0, 0), text, font=font)
+        d.text((cx - (box[2] - box[0]) // 2, y), text, fill=fill, font=font)
+        return y + (box[3] - box[1]) + 14
+
+    big, accents = _font(34)
+    small, _ = _font(24)
+    if not accents:
+        nome, endereco = fold(nome), fold(endereco)
+    y = centered(180, nome, big, "#202124")
+    for line in textwrap.wrap(endereco, 60)[:3]:
+        y = centered(y, line, small, "#5f6368")
+    label = "Ver mapa"
+    box = d.textbbox((0, 0), label, font=small)
+    tw, th = box[2] - box[0], box[3] - box[1]
+    ty = y + 30
+    d.rounded_rectangle([cx - tw // 2 - 22, ty - 12, cx + tw // 2 + 22, ty + th + 18], radius=22, fill="#1a73e8")
+    d.text((cx - tw // 2, ty), label, fill="#ffffff", font=small)
+    return im
+
+
+def generate_preview(query: str, nome: str, endereco: str) -> tuple[str, str | None]:
+    # Gera a prévia e devolve a URL (/mapas/mapa.<hash>.webp) e, se a Static Maps falhou e
+    # ficou a imagem local, o motivo
+    erro = None
+    im = None
+    if MAPS_STATIC_KEY:
+        try:
+            im = _static_map(query)
+        except (OSError, UnidentifiedImageError, ValueError) as exc:
+            erro = f"{type(exc).__name__}: {exc}"
+            logger.warning("Static Maps falhou, usando a imagem local: %s", erro)
+    if im is None:
+        im = _placeholder(nome, endereco)
+    buf = io.BytesIO()
+    im.save(buf, format="WEBP", quality=MAPS_QUALITY, method=6)
+    data = buf.getvalue()
+    name = f"mapa.{hashlib.sha256(data).hexdigest()[:12]}.webp"
+    MAPS_PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+    dest = MAPS_PREVIEW_DIR / name
+    if not dest.exists():
+        tmp = dest.with_name(f".{name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(dest)
+    os.utime(dest)
+    old = sorted(MAPS_PREVIEW_DIR.glob("mapa.*.webp"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for p in old[MAPS_KEEP:]:
+        p.unlink(missing_ok=True)
+    return f"/mapas/{name}", erro
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, Text, ForeignKey, DateTime, Table, Boolean, Numeric, Column
+from sqlalchemy import String, Integer, Text, ForeignKey, DateTime, Table, Boolean, Numeric, Column, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -23,16 +23,22 @@ class SiteConfig(Base):
     email: Mapped[str | None] = mapped_column(String(200), nullable=True)
     primary_color: Mapped[str | None] = mapped_column(String(20), nullable=True)
     maps_embed_url: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # "fachada": imagem estática (maps_preview) e o iframe só no clique; vazio = iframe direto
+    maps_modo: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    maps_preview: Mapped[str | None] = mapped_column(String(300), nullable=True)
     updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_role_username_id", "role", "username", "id"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     username: Mapped[str] = mapped_column(String(80), unique=True, index=True)
     password_hash: Mapped[str] = mapped_column(String(200))
     role: Mapped[str] = mapped_column(String(20), default="funcionario")
     status: Mapped[str] = mapped_column(String(20), default="ativo")
+    # incrementado ao trocar role/status/senha: invalida os tokens de sessão já emitidos
+    session_version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -49,6 +55,7 @@ class TipoSuite(Base):
 
 class Amenidade(Base):
     __tablename__ = "amenidades"
+    __table_args__ = (Index("ix_amenidades_nome_id", "nome", "id"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     nome: Mapped[str] = mapped_column(String(120))
     icone: Mapped[str | None] = mapped_column(String(120), nullable=True)
@@ -60,6 +67,12 @@ class Amenidade(Base):
 
 class Suite(Base):
     __tablename__ = "suites"
+    # Índices das listagens paginadas (keyset) e filtros do admin
+    __table_args__ = (
+        Index("ix_suites_ordem_titulo_id", "ordem", "titulo", "id"),
+        Index("ix_suites_tipo_id", "tipo_id"),
+        Index("ix_suites_status", "status"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     titulo: Mapped[str] = mapped_column(String(200))
     slug: Mapped[str] = mapped_column(String(200), unique=True)
@@ -80,18 +93,38 @@ class Suite(Base):
 
 class Foto(Base):
     __tablename__ = "fotos"
+    __table_args__ = (
+        Index("ix_fotos_suite_ordem_id", "suite_id", "ordem", "id"),
+        # No máximo uma capa por suíte; a capa é lida direto por "suite_id ... AND capa = true"
+        Index(
+            "ux_fotos_suite_capa",
+            "suite_id",
+            unique=True,
+            sqlite_where=text("capa = 1"),
+            postgresql_where=text("capa = true"),
+        ),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     suite_id: Mapped[int] = mapped_column(ForeignKey("suites.id"))
     url: Mapped[str] = mapped_column(String(500))
     legenda: Mapped[str | None] = mapped_column(String(200), nullable=True)
     ordem: Mapped[int] = mapped_column(Integer, default=0)
     capa: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Placeholder (fotos locais): dimensões do original, cor dominante e miniatura em data URI
+    largura: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    altura: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cor: Mapped[str | None] = mapped_column(String(9), nullable=True)
+    lqip: Mapped[str | None] = mapped_column(String(1000), nullable=True)
 
     suite: Mapped[Suite] = relationship(back_populates="fotos")
 
 
 class Funcionario(Base):
     __tablename__ = "funcionarios"
+    __table_args__ = (
+        Index("ix_funcionarios_ordem_nome_id", "ordem", "nome", "id"),
+        Index("ix_funcionarios_status", "status"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     nome: Mapped[str] = mapped_column(String(200))
     cargo: Mapped[str | None] = mapped_column(String(120), nullable=True)
@@ -100,3 +133,13 @@ class Funcionario(Base):
     email: Mapped[str | None] = mapped_column(String(200), nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="ativo")
     ordem: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ContatoClique(Base):
+    # Cliques em WhatsApp/telefone (beacon de /api/eventos), gravados em lote por app/analytics.py
+    __tablename__ = "contato_cliques"
+    __table_args__ = (Index("ix_contato_cliques_criado_em", "criado_em"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    criado_em: Mapped[DateTime] = mapped_column(DateTime(timezone=True))
+    metodo: Mapped[str] = mapped_column(String(20))
+    pagina: Mapped[str | None] = mapped_column(String(200), nullable=True)
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Profiling sob demanda: o admin arma "as próximas N requisições da rota X" e cada uma é
+# amostrada por uma thread que lê a pilha da thread do event loop a cada intervalo (ou, enquanto
+# um template em streaming renderiza no threadpool, a pilha dessa thread: ver profile_threads).
+# Desarmado, o custo por requisição é uma comparação (o arquivo de estado é relido no
+# máximo a cada PROFILE_STATE_TTL segundos, o que também propaga o comando entre workers).
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_MAX_REQUESTS = 50
+PROFILE_STATE_TTL = 1.0
+PROFILE_TOP = 30
+
+_STATE_FILE = PROFILE_DIR / "alvo.json"
+_state: dict | None = None
+_state_checked_at = 0.0
+_state_lock = threading.Lock()
+_project_root = str(Path(__file__).resolve().parents[1]) + os.sep
+
+CATEGORIES = ("SQL", "Template", "Handler", "Framework", "Ocioso")
+
+
+def _read_state() -> dict | None:
+    try:
+        data = json.loads(_STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if data.get("remaining", 0) > 0 else None
+
+
+def _write_state(data: dict | None) -> None:
+    global _state, _state_checked_at
+    if data is None or data.get("remaining", 0) <= 0:
+        _STATE_FILE.unlink(missing_ok=True)
+        data = None
+    else:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = _STATE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        tmp.replace(_STATE_FILE)
+    _state = data
+    _state_checked_at = time.monotonic()
+
+
+def arm(route: str, count: int, interval_ms: float) -> None:
+    with _state_lock:
+        _write_state({
+            "route": route,
+            "remaining": max(1, min(count, PROFILE_MAX_REQUESTS)),
+            "interval_ms": max(1.0, min(interval_ms, 50.0)),
+        })
+
+
+def disarm() -> None:
+    with _state_lock:
+        _write_state(None)
+
+
+def current_target() -> dict | None:
+    global _state, _state_checked_at
+    now = time.monotonic()
+    if now - _state_checked_at > PROFILE_STATE_TTL:
+        _state = _read_state()
+        _state_checked_at = now
+    return _state
+
+
+def _matches(route: str, path: str) -> bool:
+    if route.endswith("*"):
+        return path.startswith(route[:-1])
+    return path == route
+
+
+def claim(path: str) -> float | None:
+    # Reserva uma das N requisições armadas; devolve o intervalo de amostragem (s) ou None
+    state = current_target()
+    if state is None or not _matches(state["route"], path):
+        return None
+    with _state_lock:
+        state = _read_state()
+        if state is None or not _matches(state["route"], path):
+            _write_state(state)
+            return None
+        state["remaining"] -= 1
+        _write_state(state)
+    return state["interval_ms"] / 1000.0
+
+
+def _label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_project_root):
+        filename = filename[len(_project_root):]
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{code.co_name}"
+
+
+def _category_of(label: str) -> str:
+    filename = label.rsplit(":", 1)[0]
+    if filename.startswith(("sqlalchemy", "psycopg", "sqlite3")):
+        return "SQL"
+    if filename.startswith("jinja2") or filename.endswith(".html") or label.endswith(("_render", "_render_stream", "render_chunks")):
+        return "Template"
+    if filename.startswith("app" + os.sep):
+        return "Handler"
+    return "Framework"
+
+
+def _sample_category(stack: tuple[str, ...]) -> str:
+    # event loop parado no select: esperando I/O (ou a resposta ser consumida), sem código rodando
+    if stack[-1].startswith("selectors.py:"):
+        return "Ocioso"
+    # a categoria mais específica da pilha vence: SQL disparado no template conta como SQL
+    found = {_category_of(label) for label in stack}
+    for category in CATEGORIES:
+        if category in found:
+            return category
+    return "Framework"
+
+
+_active_samplers = 0
+_default_switch_interval = sys.getswitchinterval()
+
+
+class Sampler(threading.Thread):
+    def __init__(self, target_ident: int, interval: float):
+        super().__init__(name="profiler", daemon=True)
+        self.target_ident = target_ident
+        # threads do threadpool trabalhando para a requisição agora (ex.: gerando o HTML)
+        self.workers: set[int] = set()
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._stop_event = threading.Event()
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        global _active_samplers
+        # a thread amostradora só roda quando a do event loop solta a GIL: enquanto houver
+        # perfil em andamento, troca de thread mais vezes para respeitar o intervalo
+        with _state_lock:
+            _active_samplers += 1
+            sys.setswitchinterval(min(_default_switch_interval, self.interval / 20))
+        super().start()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            # com uma thread do pool trabalhando, o event loop só espera por ela: amostra a thread
+            idents = list(self.workers) or [self.target_ident]
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self.started_at
+        self._stop_event.set()
+        self.join()
+        global _active_samplers
+        with _state_lock:
+            _active_samplers -= 1
+            if _active_samplers == 0:
+                sys.setswitchinterval(_default_switch_interval)
+
+
+_current_sampler: ContextVar[Sampler | None] = ContextVar("current_sampler", default=None)
+
+
+def profile_threads(iterator):
+    # Iterador síncrono consumido no threadpool (StreamingResponse): com perfil ativo na
+    # requisição, cada next() registra a thread que o executa no Sampler enquanto roda.
+    sampler = _current_sampler.get()
+    if sampler is None:
+        return iterator
+    return _watched(sampler, iter(iterator))
+
+
+def _watched(sampler: Sampler, iterator):
+    while True:
+        ident = threading.get_ident()
+        sampler.workers.add(ident)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            sampler.workers.discard(ident)
+        yield item
+
+
+def save_profile(sampler: Sampler, method: str, path: str, status_code: int) -> Path:
+    total = sum(sampler.samples.values())
+    categories: Counter[str] = Counter()
+    self_counts: Counter[str] = Counter()
+    inclusive: Counter[str] = Counter()
+    for stack, n in sampler.samples.items():
+        categories[_sample_category(stack)] += n
+        self_counts[stack[-1]] += n
+        for label in set(stack):
+            # no inclusivo só entra código do app, SQL e templates (o resto é a base de toda pilha)
+            if _category_of(label) != "Framework":
+                inclusive[label] += n
+
+    def _top(counter: Counter) -> list[dict]:
+        return [
+            {"funcao": label, "amostras": n, "pct": round(100.0 * n / total, 1), "categoria": _category_of(label)}
+            for label, n in counter.most_common(PROFILE_TOP)
+        ]
+
+    now = datetime.now(timezone.utc)
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", path).strip("-") or "raiz"
+    name = f"{now.strftime('%Y%m%dT%H%M%S%fZ')}-{slug[:60]}.json"
+    profile = {
+        "nome": name,
+        "quando": now.isoformat(timespec="seconds"),
+        "metodo": method,
+        "rota": path,
+        "status": status_code,
+        "duracao_ms": round(sampler.elapsed * 1000.0, 2),
+        "intervalo_ms": round(sampler.interval * 1000.0, 2),
+        "amostras": total,
+        "categorias": {c: categories.get(c, 0) for c in CATEGORIES},
+        "proprio": _top(self_counts),
+        "inclusivo": _top(inclusive),
+        # formato "pilha;em;linhas contagem" (flamegraph.pl / speedscope)
+        "pilhas": [";".join(stack) + f" {n}" for stack, n in sampler.samples.most_common()],
+    }
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    dest = PROFILE_DIR / name
+    dest.write_text(json.dumps(profile, ensure_ascii=False), encoding="utf-8")
+    for old in list_profiles()[PROFILE_KEEP:]:
+        (PROFILE_DIR / old["nome"]).unlink(missing_ok=True)
+    return dest
+
+
+def list_profiles() -> list[dict]:
+    items = []
+    for p in sorted(PROFILE_DIR.glob("2*.json"), reverse=True):
+        try:
+            data = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        items.append({k: data.get(k) for k in ("nome", "quando", "metodo", "rota", "status", "duracao_ms", "amostras", "categorias")})
+    return items
+
+
+def load_profile(name: str) -> dict | None:
+    if not re.fullmatch(r"[0-9TZ]+-[a-zA-Z0-9-]+\.json", name):
+        return None
+    try:
+        return json.loads((PROFILE_DIR / name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class ProfileMiddleware:
+    # Middleware ASGI puro (sem BaseHTTPMiddleware): desarmado, é só uma chamada a mais.
+    # Armado, amostra até a última parte do corpo sair; o HTML em streaming, gerado no threadpool,
+    # entra pelo profile_threads (chamado no _render_stream).
+    def __init__(self, app, exclude_prefix: str = "/admin/perfis"):
+        self.app = app
+        self.exclude_prefix = exclude_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or current_target() is None:
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        interval = None if path.startswith(self.exclude_prefix) else claim(path)
+        if interval is None:
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        sampler = Sampler(threading.get_ident(), interval)
+        sampler.start()
+        token = _current_sampler.set(sampler)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_sampler.reset(token)
+            sampler.stop()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, save_profile, sampler, scope["method"], path, status_code)
@@ -0,0 +1,197 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .staticfiles import STATIC_PREFIXES
+
+# Limite por cliente (IP) com token bucket: cada política tem capacidade (rajada) e reposição
+# (fichas por segundo). O balde guarda só [fichas, instante]; a reposição é calculada na hora,
+# então cada requisição custa O(1). Em memória (por worker, LRU limitado a RATE_LIMIT_MAX_CLIENTS)
+# ou, com RATE_LIMIT_BACKEND=sqlite, num arquivo compartilhado entre os workers.
+RATE_LIMIT = os.getenv("RATE_LIMIT", "1").lower() not in ("0", "false", "no")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "ratelimit.db")
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# atrás de proxy (Render): quantos proxies confiáveis acrescentam ao X-Forwarded-For
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+RATE_LIMIT_EXEMPT_PREFIXES = STATIC_PREFIXES
+_LOOPBACK = {"127.0.0.1", "::1"}  # ferramentas locais (e proxy local sem RATE_LIMIT_PROXY_HOPS)
+# backend sqlite: espera curta pelo lock do arquivo (roda no event loop); depois deixa passar
+RATE_LIMIT_DB_TIMEOUT = float(os.getenv("RATE_LIMIT_DB_TIMEOUT", "0.05"))
+
+logger = logging.getLogger("belavista.ratelimit")
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    capacity: float
+    per_second: float
+
+
+LOGIN = Policy("login", capacity=5, per_second=5 / 60)  # 5 tentativas, depois 1 a cada 12s
+SITEMAP = Policy("sitemap", capacity=5, per_second=1 / 60)
+PAGES = Policy("paginas", capacity=120, per_second=2)
+EVENTS = Policy("eventos", capacity=20, per_second=1 / 10)  # beacon de cliques de contato
+
+
+def policy_for(method: str, path: str) -> Policy | None:
+    if path in ("/login", "/admin/login"):
+        return LOGIN if method == "POST" else PAGES
+    if path == "/sitemap.xml":
+        return SITEMAP
+    if path == "/api/eventos":
+        return EVENTS
+    if method in ("GET", "HEAD") and not path.startswith(RATE_LIMIT_EXEMPT_PREFIXES):
+        return PAGES
+    return None
+
+
+class MemoryBuckets:
+    def __init__(self, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+
+    def take(self, policy: Policy, client: str, now: float) -> float:
+        # Consome uma ficha; devolve 0 se liberado ou os segundos até haver ficha
+        key = (policy.name, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [policy.capacity, now]
+            if len(self._buckets) > self.max_clients:
+                # o menos recente é o que está parado há mais tempo (balde provavelmente cheio)
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(policy.capacity, bucket[0] + (now - bucket[1]) * policy.per_second)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / policy.per_second
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    # Um UPSERT ... RETURNING por requisição; baldes parados há mais de uma hora são apagados
+    # de tempos em tempos. Durabilidade não importa aqui (synchronous=OFF). Se o arquivo estiver
+    # travado ou com erro, a requisição passa (fail open) e a falha é contada em /admin/metricas.
+    PRUNE_EVERY = 1000
+    IDLE_SECONDS = 3600
+
+    def __init__(self, path: str = RATE_LIMIT_DB):
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=RATE_LIMIT_DB_TIMEOUT
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL, ok INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._calls = 0
+        self.errors = 0
+        self.last_error: str | None = None
+
+    def take(self, policy: Policy, client: str, now: float) -> float:
+        with self._lock:
+            try:
+                tokens, ok = self._conn.execute(
+                    """
+                    INSERT INTO buckets (key, tokens, ts, ok) VALUES (?1, ?2 - 1, ?3, 1)
+                    ON CONFLICT(key) DO UPDATE SET
+                        ok = min(?2, tokens + (?3 - ts) * ?4) >= 1,
+                        tokens = min(?2, tokens + (?3 - ts) * ?4) - (min(?2, tokens + (?3 - ts) * ?4) >= 1),
+                        ts = ?3
+                    RETURNING tokens, ok
+                    """,
+                    (f"{policy.name}:{client}", policy.capacity, now, policy.per_second),
+                ).fetchone()
+                self._calls += 1
+                if self._calls % self.PRUNE_EVERY == 0:
+                    self._conn.execute("DELETE FROM buckets WHERE ts < ?", (now - self.IDLE_SECONDS,))
+            except sqlite3.Error as exc:
+                self.errors += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                if self.errors == 1 or self.errors % 1000 == 0:
+                    logger.warning("rate limit sem o banco (requisição liberada): %s", self.last_error)
+                return 0.0
+        return 0.0 if ok else (1 - tokens) / policy.per_second
+
+    def __len__(self) -> int:
+        with self._lock:
+            try:
+                return self._conn.execute("SELECT count(*) FROM buckets").fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_PROXY_HOPS > 0:
+        forwarded = next((v for k, v in scope["headers"] if k == b"x-forwarded-for"), None)
+        if forwarded:
+            hops = [h.strip() for h in forwarded.decode("latin-1").split(",") if h.strip()]
+            if hops:
+                # o cliente pode forjar o começo da lista; confiável é o que os proxies acrescentaram
+                return hops[-min(RATE_LIMIT_PROXY_HOPS, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+class RateLimiter:
+    def __init__(self, backend: str = RATE_LIMIT_BACKEND):
+        self.buckets = SQLiteBuckets() if backend == "sqlite" else MemoryBuckets()
+        self.backend = backend
+        self.rejected: dict[str, int] = {}
+
+    def check(self, method: str, path: str, client: str) -> tuple[Policy | None, float]:
+        policy = policy_for(method, path)
+        if policy is None or not client or client in _LOOPBACK:
+            return None, 0.0
+        wait = self.buckets.take(policy, client, time.monotonic() if self.backend != "sqlite" else time.time())
+        if wait:
+            self.rejected[policy.name] = self.rejected.get(policy.name, 0) + 1
+        return policy, wait
+
+    def stats(self) -> dict:
+        stats = {"backend": self.backend, "baldes": len(self.buckets), "recusadas": dict(self.rejected)}
+        if isinstance(self.buckets, SQLiteBuckets):
+            stats["falhas_banco"] = self.buckets.errors
+            stats["ultimo_erro"] = self.buckets.last_error
+        return stats
+
+
+limiter = RateLimiter() if RATE_LIMIT else None
+
+
+class RateLimitMiddleware:
+    # Middleware ASGI puro: 429 + Retry-After antes de chegar ao handler
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        _policy, wait = self.limiter.check(scope["method"], scope["path"], client_ip(scope))
+        if not wait:
+            return await self.app(scope, receive, send)
+        body = "Muitas requisições, tente novamente em instantes.".encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
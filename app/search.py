@@ -0,0 +1,177 @@
+import re
+import unicodedata
+
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.orm import Session
+
+from .database import engine
+from .models import Amenidade, Suite, TipoSuite, suite_amenidade
+
+# Índice de busca textual das suítes (título, descrição, tipo e amenidades):
+# - SQLite: tabela virtual FTS5 "suites_fts" (rowid = suites.id), tokenizer sem acentos
+# - PostgreSQL: tabela "suites_busca" com tsvector em português e índice GIN
+# O texto é normalizado sem acentos também aqui, para "suite" achar "Suíte" nos dois bancos.
+
+SEARCH_BATCH = 500
+SEARCH_MAX_TERMS = 8
+# pesos do bm25 por coluna: título, descrição, tipo, amenidades
+SEARCH_BM25_WEIGHTS = "10.0, 1.0, 5.0, 2.0"
+
+
+def _dialect() -> str:
+    return engine.dialect.name
+
+
+def fold(value: str | None) -> str:
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _terms(q: str) -> list[str]:
+    return re.findall(r"\w+", fold(q).lower())[:SEARCH_MAX_TERMS]
+
+
+def ensure_search_index() -> None:
+    dialect = _dialect()
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS suites_fts USING fts5("
+                "titulo, descricao, tipo, amenidades, tokenize='unicode61 remove_diacritics 2')"
+            )
+            # a coluna oculta "rank" passa a ser o bm25 com pesos: "ORDER BY rank" ordena no FTS5
+            conn.exec_driver_sql(
+                f"INSERT INTO suites_fts (suites_fts, rank) VALUES ('rank', 'bm25({SEARCH_BM25_WEIGHTS})')"
+            )
+            indexed = conn.exec_driver_sql("SELECT count(*) FROM suites_fts").scalar_one()
+        elif dialect == "postgresql":
+            conn.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS suites_busca ("
+                "suite_id INTEGER PRIMARY KEY REFERENCES suites(id) ON DELETE CASCADE, documento tsvector NOT NULL)"
+            )
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_suites_busca_documento ON suites_busca USING GIN (documento)"
+            )
+            indexed = conn.exec_driver_sql("SELECT count(*) FROM suites_busca").scalar_one()
+        else:
+            return
+        total = conn.execute(select(func.count(Suite.id))).scalar_one()
+        if indexed != total:
+            reindex_suites(conn)
+
+
+def remove_suites(db, suite_ids: list[int]) -> None:
+    dialect = _dialect()
+    for i in range(0, len(suite_ids), SEARCH_BATCH):
+        batch = suite_ids[i:i + SEARCH_BATCH]
+        if dialect == "sqlite":
+            db.execute(
+                text("DELETE FROM suites_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": batch},
+            )
+        elif dialect == "postgresql":
+            db.execute(text("DELETE FROM suites_busca WHERE suite_id = ANY(:ids)"), {"ids": batch})
+
+
+def reindex_suites(db, suite_ids: list[int] | None = None) -> None:
+    # Recalcula os documentos das suítes indicadas (todas se None) na transação de quem chamou
+    dialect = _dialect()
+    if dialect not in ("sqlite", "postgresql"):
+        return
+    if isinstance(db, Session):
+        db.flush()
+    if suite_ids is None:
+        if dialect == "sqlite":
+            db.execute(text("DELETE FROM suites_fts"))
+        else:
+            db.execute(text("DELETE FROM suites_busca"))
+        suite_ids = list(db.execute(select(Suite.id).order_by(Suite.id)).scalars().all())
+    else:
+        suite_ids = list(dict.fromkeys(suite_ids))
+        remove_suites(db, suite_ids)
+
+    for i in range(0, len(suite_ids), SEARCH_BATCH):
+        batch = suite_ids[i:i + SEARCH_BATCH]
+        amen: dict[int, list[str]] = {}
+        for sid, nome in db.execute(
+            select(suite_amenidade.c.suite_id, Amenidade.nome)
+            .join(Amenidade, Amenidade.id == suite_amenidade.c.amenidade_id)
+            .where(suite_amenidade.c.suite_id.in_(batch))
+        ).all():
+            amen.setdefault(sid, []).append(nome)
+        docs = [
+            {
+                "id": sid,
+                "titulo": fold(titulo),
+                "descricao": fold(descricao),
+                "tipo": fold(tipo),
+                "amenidades": fold(" ".join(amen.get(sid, []))),
+            }
+            for sid, titulo, descricao, tipo in db.execute(
+                select(Suite.id, Suite.titulo, Suite.descricao, TipoSuite.nome)
+                .outerjoin(TipoSuite, TipoSuite.id == Suite.tipo_id)
+                .where(Suite.id.in_(batch))
+            ).all()
+        ]
+        if not docs:
+            continue
+        if dialect == "sqlite":
+            db.execute(
+                text(
+                    "INSERT INTO suites_fts (rowid, titulo, descricao, tipo, amenidades) "
+                    "VALUES (:id, :titulo, :descricao, :tipo, :amenidades)"
+                ),
+                docs,
+            )
+        else:
+            db.execute(
+                text(
+                    "INSERT INTO suites_busca (suite_id, documento) VALUES (:id, "
+                    "setweight(to_tsvector('portuguese', :titulo), 'A') || "
+                    "setweight(to_tsvector('portuguese', :tipo), 'B') || "
+                    "setweight(to_tsvector('portuguese', :amenidades), 'C') || "
+                    "setweight(to_tsvector('portuguese', :descricao), 'D'))"
+                ),
+                docs,
+            )
+
+
+def suite_ids_for_tipo(db, tipo_id: int) -> list[int]:
+    return list(db.execute(select(Suite.id).where(Suite.tipo_id == tipo_id)).scalars().all())
+
+
+def suite_ids_for_amenidade(db, amenidade_id: int) -> list[int]:
+    return list(
+        db.execute(
+            select(suite_amenidade.c.suite_id).where(suite_amenidade.c.amenidade_id == amenidade_id)
+        ).scalars().all()
+    )
+
+
+def search_suites(db, q: str, limit: int = 50) -> list[int]:
+    # ids das suítes em ordem de relevância; cada termo vale como prefixo ("hidro" acha "hidromassagem")
+    terms = _terms(q)
+    if not terms:
+        return []
+    dialect = _dialect()
+    if dialect == "sqlite":
+        # ordena pelo bm25 com pesos (rank configurado em ensure_search_index) antes do LIMIT
+        match = " ".join(f'"{t}"*' for t in terms)
+        rows = db.execute(
+            text("SELECT rowid FROM suites_fts WHERE suites_fts MATCH :m ORDER BY rank LIMIT :n"),
+            {"m": match, "n": limit},
+        )
+    elif dialect == "postgresql":
+        tsq = " & ".join(f"{t}:*" for t in terms)
+        rows = db.execute(
+            text(
+                "SELECT suite_id FROM suites_busca WHERE documento @@ to_tsquery('portuguese', :q) "
+                "ORDER BY ts_rank(documento, to_tsquery('portuguese', :q)) DESC LIMIT :n"
+            ),
+            {"q": tsq, "n": limit},
+        )
+    else:
+        rows = db.execute(
+            select(Suite.id).where(*[Suite.titulo.ilike(f"%{t}%") for t in terms]).limit(limit)
+        )
+    return [r[0] for r in rows]
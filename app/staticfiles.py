@@ -0,0 +1,39 @@
+from typing import Optional
+
+from fastapi.staticfiles import StaticFiles
+
+# Montagens de arquivos (app.mount em main.py) e o /img redimensionado: os middlewares deixam
+# esses caminhos de fora (fila de admissão, rate limit, CDN, Early Hints). Montagem nova entra aqui.
+STATIC_PREFIXES = ("/static/", "/fotos-apartamentos/", "/fotos-apartamentos-web/", "/img/", "/mapas/")
+
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(
+        self,
+        *args,
+        cache_control: str = "public, max-age=2592000, immutable",
+        cache_extensions: Optional[set[str]] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._cache_control = cache_control
+        self._cache_extensions = cache_extensions or {
+            ".webp",
+            ".jpg",
+            ".jpeg",
+            ".png",
+            ".gif",
+            ".svg",
+            ".ico",
+            ".css",  # só há CSS com hash no nome em /static/css (app/css.py)
+        }
+
+    async def get_response(self, path: str, scope):
+        resp = await super().get_response(path, scope)
+        if getattr(resp, "status_code", None) == 200:
+            p = path.lower()
+            for ext in self._cache_extensions:
+                if p.endswith(ext):
+                    resp.headers["Cache-Control"] = self._cache_control
+                    break
+        return resp
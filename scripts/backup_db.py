@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from app.backup import (
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_PAUSE,
+    backup_sqlite,
+    list_backups,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backup online do banco SQLite (não bloqueia o site)")
+    parser.add_argument("--dest", type=str, default=str(BACKUP_DIR), help="diretório dos backups")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="quantos backups manter (0 = todos)")
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP, help="páginas copiadas por passo")
+    parser.add_argument("--pause", type=float, default=BACKUP_STEP_PAUSE, help="pausa entre passos (s)")
+    parser.add_argument("--no-compress", action="store_true", help="grava o .db sem gzip")
+    parser.add_argument("--list", action="store_true", help="apenas lista os backups existentes")
+    args = parser.parse_args()
+
+    dest = Path(args.dest)
+    if args.list:
+        for p in list_backups(dest):
+            print(f"{p.name}  {p.stat().st_size / 1024:.0f} KB")
+        return 0
+
+    t0 = time.perf_counter()
+    try:
+        path = backup_sqlite(dest, keep=args.keep, pages=args.pages, pause=args.pause, compress=not args.no_compress)
+    except RuntimeError as exc:
+        print(f"Erro: {exc}", file=sys.stderr)
+        return 1
+    print(f"Backup {path} ({path.stat().st_size / 1024:.0f} KB) em {time.perf_counter() - t0:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Rotas medidas por padrão; "{slug}" é trocado pelo slug de uma suíte existente.
+DEFAULT_ROUTES = [
+    "/",
+    "/apartamentos",
+    "/suites",
+    "/suites/{slug}",
+    "/sitemap.xml",
+    "/static/img/logo.svg",
+]
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = PROJECT_ROOT / "scripts" / "benchmark_baseline.json"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int) -> dict[str, float]:
+    ms = [v * 1000.0 for v in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+# ---------------------- In-process (ASGI direto) ----------------------
+async def _asgi_get(app, path: str) -> int:
+    raw_path, _, qs = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode("utf-8"),
+        "query_string": qs.encode("utf-8"),
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"user-agent", b"bela-vista-bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    status_code = 0
+    done = asyncio.Event()
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status_code
+
+
+async def _bench_inprocess_route(app, path: str, requests: int, concurrency: int) -> dict[str, float]:
+    latencies: list[float] = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            t0 = time.perf_counter()
+            code = await _asgi_get(app, path)
+            latencies.append(time.perf_counter() - t0)
+            if code >= 400:
+                errors += 1
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - t_start, errors)
+
+
+def run_inprocess(routes: list[str], requests: int, concurrency: int, warmup: int) -> dict[str, dict]:
+    from app.main import app
+
+    async def _run():
+        results: dict[str, dict] = {}
+        for path in routes:
+            for _ in range(warmup):
+                await _asgi_get(app, path)
+            results[path] = await _bench_inprocess_route(app, path, requests, concurrency)
+        return results
+
+    return asyncio.run(_run())
+
+
+# ---------------------- Uvicorn local (HTTP real) ----------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"uvicorn não respondeu na porta {port}")
+
+
+def _http_worker(port: int, path: str, count: int) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for _ in range(count):
+        t0 = time.perf_counter()
+        conn.request("GET", path, headers={"Host": "localhost", "User-Agent": "bela-vista-bench"})
+        resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - t0)
+        if resp.status >= 400:
+            errors += 1
+    conn.close()
+    return latencies, errors
+
+
+def run_uvicorn(routes: list[str], requests: int, concurrency: int, warmup: int, workers: int) -> dict[str, dict]:
+    port = _free_port()
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    proc = subprocess.Popen(cmd, cwd=str(PROJECT_ROOT), env=os.environ.copy())
+    try:
+        _wait_port(port)
+        results: dict[str, dict] = {}
+        for path in routes:
+            _http_worker(port, path, warmup)
+            per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+            t_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                parts = list(pool.map(lambda n: _http_worker(port, path, n), per_worker))
+            elapsed = time.perf_counter() - t_start
+            latencies = [v for lat, _ in parts for v in lat]
+            results[path] = summarize(latencies, elapsed, sum(e for _, e in parts))
+        return results
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---------------------- Busca textual ----------------------
+SEARCH_TERMS = ["sintetica", "luxo", "amenidade 3", "suite 99", "hidro", "standard carga", "tematica", "xyz"]
+
+
+def run_search(requests: int) -> dict[str, dict]:
+    from app.database import get_session
+    from app.search import search_suites
+
+    results: dict[str, dict] = {}
+    with get_session() as db:
+        for term in SEARCH_TERMS:
+            search_suites(db, term)
+            latencies: list[float] = []
+            t_start = time.perf_counter()
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                search_suites(db, term, limit=20)
+                latencies.append(time.perf_counter() - t0)
+            results[f"q={term}"] = summarize(latencies, time.perf_counter() - t_start, 0)
+    return results
+
+
+# ---------------------- Limite por cliente (token bucket) ----------------------
+async def _noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def run_ratelimit(requests: int) -> dict[str, dict]:
+    # Custo do limitador isolado: uma ficha por chamada, com o mesmo cliente (balde quente) e com
+    # clientes sempre novos (inserção + despejo LRU); e o middleware em volta de um app vazio.
+    from app.ratelimit import PAGES, MemoryBuckets, RateLimiter, RateLimitMiddleware, SQLiteBuckets
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bv-rl-") as tmp:
+        backends = {
+            "memory": MemoryBuckets(max_clients=1000),
+            "sqlite": SQLiteBuckets(str(Path(tmp) / "ratelimit.db")),
+        }
+        for name, buckets in backends.items():
+            for label, client_of in (("mesmo cliente", lambda i: "10.0.0.1"), ("clientes novos", lambda i: f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")):
+                latencies: list[float] = []
+                t_start = time.perf_counter()
+                for i in range(requests):
+                    t0 = time.perf_counter()
+                    buckets.take(PAGES, client_of(i), time.time())
+                    latencies.append(time.perf_counter() - t0)
+                results[f"take {name}, {label}"] = summarize(latencies, time.perf_counter() - t_start, 0)
+
+    async def _middleware(app) -> dict:
+        latencies: list[float] = []
+        t_start = time.perf_counter()
+        for i in range(requests):
+            scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "client": (f"10.1.{i >> 8 & 255}.{i & 255}", 1)}
+            t0 = time.perf_counter()
+            await app(scope, None, _noop_send)
+            latencies.append(time.perf_counter() - t0)
+        return summarize(latencies, time.perf_counter() - t_start, 0)
+
+    async def _noop_send(message):
+        pass
+
+    results["asgi sem limite"] = asyncio.run(_middleware(_noop_app))
+    results["asgi com limite (memory)"] = asyncio.run(_middleware(RateLimitMiddleware(_noop_app, RateLimiter("memory"))))
+    return results
+
+
+# ---------------------- Profiler em rota com streaming ----------------------
+def run_profile(routes: list[str], requests: int) -> dict[str, dict]:
+    # Arma o /admin/perfis para a rota e confere a divisão das amostras: numa página em streaming
+    # (TEMPLATE_STREAMING) o HTML é gerado no threadpool e tem de aparecer como Template, não Ocioso.
+    # O que sobra de Ocioso é o event loop esperando a troca de thread entre um bloco e outro.
+    from app.main import app
+    from app.profiling import CATEGORIES, arm, list_profiles
+
+    async def _run(path: str) -> None:
+        for _ in range(requests):
+            await _asgi_get(app, path)
+
+    results: dict[str, dict] = {}
+    for path in routes:
+        arm(path, requests, 2.0)
+        asyncio.run(_run(path))
+        totals = dict.fromkeys(CATEGORIES, 0)
+        for item in list_profiles():
+            if item["rota"] == path:
+                for category, n in (item["categorias"] or {}).items():
+                    totals[category] = totals.get(category, 0) + n
+        results[path] = totals
+    return results
+
+
+# ---------------------- Relatório / baseline ----------------------
+def print_report(mode: str, results: dict[str, dict]) -> None:
+    print(f"\n[{mode}]")
+    print(f"{'rota':<34} {'req':>6} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for path, r in results.items():
+        print(
+            f"{path:<34} {r['requests']:>6} {r['errors']:>5} {r['rps']:>9.1f} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for mode, routes in current.items():
+        base_routes = baseline.get(mode, {})
+        for path, r in routes.items():
+            b = base_routes.get(path)
+            if not b:
+                continue
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if b[key] > 0 and r[key] > b[key] * (1 + tolerance):
+                    regressions.append(f"[{mode}] {path} {key}: {b[key]:.2f} -> {r[key]:.2f}")
+            if b["rps"] > 0 and r["rps"] < b["rps"] * (1 - tolerance):
+                regressions.append(f"[{mode}] {path} rps: {b['rps']:.1f} -> {r['rps']:.1f}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das rotas públicas do site")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both", "search", "ratelimit", "profile"], default="inprocess")
+    parser.add_argument("--db", type=str, default=None, help="arquivo SQLite (padrão: temporário)")
+    parser.add_argument("--suites", type=int, default=200)
+    parser.add_argument("--fotos", type=int, default=6)
+    parser.add_argument("--amenidades", type=int, default=12)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn")
+    parser.add_argument("--route", action="append", default=None, help="rota a medir (repetível)")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="regressão aceita (0.15 = 15%%)")
+    parser.add_argument("--json", type=str, default=None, help="salva o resultado em JSON")
+    args = parser.parse_args()
+
+    # O app lê DATABASE_URL na importação: configurar antes de importar app.*
+    db_path = Path(args.db) if args.db else Path(tempfile.mkdtemp(prefix="bv-bench-")) / "bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path.resolve()}"
+    os.environ.setdefault("SESSION_SECRET", "bench")
+    if args.mode == "profile":
+        os.environ["PROFILE_DIR"] = str(db_path.parent / "profiles")
+    os.chdir(PROJECT_ROOT)
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+    from scripts.seed import seed_synthetic
+
+    t0 = time.perf_counter()
+    seed_synthetic(args.suites, fotos=args.fotos, amenidades=args.amenidades)
+    print(f"Seed em {time.perf_counter() - t0:.2f}s ({db_path})")
+
+    from sqlalchemy import select
+    from app.database import get_session
+    from app.models import Suite
+
+    with get_session() as db:
+        slug = db.execute(select(Suite.slug).order_by(Suite.id.asc()).limit(1)).scalar_one_or_none() or ""
+    routes = [r.replace("{slug}", slug) for r in (args.route or DEFAULT_ROUTES)]
+
+    results: dict[str, dict] = {}
+    if args.mode in ("inprocess", "both"):
+        results["inprocess"] = run_inprocess(routes, args.requests, args.concurrency, args.warmup)
+        print_report("inprocess", results["inprocess"])
+    if args.mode in ("uvicorn", "both"):
+        results["uvicorn"] = run_uvicorn(routes, args.requests, args.concurrency, args.warmup, args.workers)
+        print_report("uvicorn", results["uvicorn"])
+    if args.mode in ("search", "both"):
+        results["search"] = run_search(args.requests)
+        print_report("search", results["search"])
+    if args.mode == "ratelimit":
+        results["ratelimit"] = run_ratelimit(args.requests)
+        print_report("ratelimit", results["ratelimit"])
+    if args.mode == "profile":
+        streamed = [r for r in routes if not r.startswith("/static/") and r != "/sitemap.xml"]
+        falhas = []
+        print("\n[profile] amostras por categoria")
+        for path, totals in run_profile(streamed, args.requests).items():
+            print(f"{path:<34} " + "  ".join(f"{c} {n}" for c, n in totals.items()))
+            if totals["Template"] == 0:
+                falhas.append(path)
+        if falhas:
+            print(f"\nNenhuma amostra de Template (renderização fora do perfil): {', '.join(falhas)}")
+            return 1
+        return 0
+
+    meta = {
+        "suites": args.suites,
+        "fotos": args.fotos,
+        "amenidades": args.amenidades,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "python": sys.version.split()[0],
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+        print(f"\nBaseline salvo em {baseline_path}")
+        return 0
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        regressions = compare(baseline.get("results", {}), results, args.tolerance)
+        if regressions:
+            print(f"\nRegressões acima de {args.tolerance:.0%} em relação ao baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nSem regressões acima de {args.tolerance:.0%} em relação ao baseline")
+    else:
+        # o baseline é da máquina (não vai para o repositório): crie antes de comparar
+        print(f"\nSem baseline em {baseline_path}: rode de novo com --save-baseline (mesmos parâmetros) para criar")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
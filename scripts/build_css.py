@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from app.css import CSS_OUT_DIR, build_css
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Gera o CSS do site com hash no nome (app/static/css)")
+    parser.parse_args()
+
+    manifest = build_css()
+    print(f"OK: {manifest['site.css']} ({len(manifest['critico'])} bytes de CSS crítico inline)")
+    print(f"Versões mantidas em {CSS_OUT_DIR}: {', '.join(manifest['historico'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
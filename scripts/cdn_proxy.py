@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# CDN de mentira para testar localmente o que app/cdn.py emite: guarda respostas públicas pelo
+# s-maxage, serve vencidas dentro do stale-while-revalidate (atualizando em segundo plano), passa
+# direto quem tem cookie bv_session e descarta por etiqueta ao receber
+# PURGE / com "Surrogate-Key: k1 k2" (o que o HTTPPurger manda com CDN_PURGE_URL apontando aqui).
+_DIRECTIVE = re.compile(r"([a-z-]+)(?:=(\d+))?")
+_HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade", "proxy-connection"}
+
+
+def _ttls(cache_control: str) -> tuple[int, int] | None:
+    directives = {m.group(1): m.group(2) for m in _DIRECTIVE.finditer(cache_control.lower())}
+    if "public" not in directives or "s-maxage" not in directives:
+        return None
+    return int(directives["s-maxage"]), int(directives.get("stale-while-revalidate") or 0)
+
+
+class Cache:
+    def __init__(self):
+        self.entries: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self.lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, entry: dict) -> None:
+        with self.lock:
+            self.entries[key] = entry
+
+    def purge(self, tags: set[str]) -> int:
+        with self.lock:
+            gone = [k for k, e in self.entries.items() if tags & e["tags"]]
+            for k in gone:
+                del self.entries[k]
+        return len(gone)
+
+
+def make_handler(upstream: str, cache: Cache, verbose: bool):
+    target = urlsplit(upstream)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if verbose:
+                super().log_message(fmt, *args)
+
+        def _fetch(self, method: str, body: bytes | None = None) -> tuple[int, list[tuple[str, str]], bytes]:
+            conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_BY_HOP}
+            forwarded = self.headers.get("X-Forwarded-For")
+            headers["X-Forwarded-For"] = f"{forwarded}, {self.client_address[0]}" if forwarded else self.client_address[0]
+            conn.request(method, self.path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+            conn.close()
+            return resp.status, [(k, v) for k, v in resp.getheaders() if k.lower() not in _HOP_BY_HOP], data
+
+        def _store(self, key: str, status: int, headers: list[tuple[str, str]], data: bytes) -> None:
+            cc = next((v for k, v in headers if k.lower() == "cache-control"), "")
+            ttls = _ttls(cc) if status == 200 else None
+            if ttls is None:
+                return
+            tags = next((v for k, v in headers if k.lower() == "surrogate-key"), "")
+            cache.put(key, {
+                "status": status,
+                "headers": headers,
+                "body": data,
+                "tags": set(tags.split()),
+                "stored": time.monotonic(),
+                "ttl": ttls[0],
+                "swr": ttls[1],
+                "refreshing": False,
+            })
+
+        def _reply(self, status: int, headers: list[tuple[str, str]], data: bytes, state: str) -> None:
+            self.send_response(status)
+            for k, v in headers:
+                # como uma CDN de verdade, as etiquetas não vão para o cliente
+                if k.lower() not in ("surrogate-key", "content-length"):
+                    self.send_header(k, v)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("X-Cache", state)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        def _refresh(self, key: str) -> None:
+            try:
+                self._store(key, *self._fetch("GET"))
+            finally:
+                entry = cache.get(key)
+                if entry is not None:
+                    entry["refreshing"] = False
+
+        def do_GET(self):
+            key = f"{self.headers.get('Host', '')}{self.path}"
+            if "bv_session=" in (self.headers.get("Cookie") or ""):
+                return self._reply(*self._fetch(self.command), "PASS")
+            entry = cache.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry["stored"]
+                if age <= entry["ttl"]:
+                    return self._reply(entry["status"], entry["headers"] + [("Age", str(int(age)))], entry["body"], "HIT")
+                if age <= entry["ttl"] + entry["swr"]:
+                    if not entry["refreshing"]:
+                        entry["refreshing"] = True
+                        threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+                    return self._reply(entry["status"], entry["headers"] + [("Age", str(int(age)))], entry["body"], "STALE")
+            status, headers, data = self._fetch("GET")
+            self._store(key, status, headers, data)
+            self._reply(status, headers, data, "MISS")
+
+        do_HEAD = do_GET
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self._reply(*self._fetch("POST", self.rfile.read(length) if length else None), "PASS")
+
+        def do_PURGE(self):
+            tags = set((self.headers.get("Surrogate-Key") or "").split())
+            removed = cache.purge(tags) if tags else 0
+            print(f"PURGE {' '.join(sorted(tags)) or '(sem etiquetas)'}: {removed} respostas descartadas", flush=True)
+            body = f"{removed}\n".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Proxy de cache local (imita a CDN) na frente do site")
+    parser.add_argument("--upstream", default="http://127.0.0.1:8000", help="endereço do uvicorn")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--verbose", action="store_true", help="uma linha por requisição")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.upstream, Cache(), args.verbose))
+    print(f"Proxy em http://127.0.0.1:{args.port} -> {args.upstream} (purge: PURGE http://127.0.0.1:{args.port}/)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Connection
+
+from app.database import Base, engine
+from app.models import Amenidade, Foto, Suite, TipoSuite, suite_amenidade
+from app.search import ensure_search_index, reindex_suites
+from scripts.seed import slugify
+
+BATCH_SIZE = 500
+
+# Formato JSON aceito:
+# {"tipos": [{"nome", "descricao", "ordem"}],
+#  "amenidades": [{"nome", "icone"}],
+#  "suites": [{"titulo", "slug", "tipo", "descricao", "preco_hora", "preco_pernoite",
+#              "destaque", "ordem", "status", "amenidades": [nomes], "fotos": [url | {url, legenda, capa}]}]}
+# ou apenas a lista de suítes. No CSV, cada linha é uma suíte e as colunas
+# "amenidades" e "fotos" usam "|" como separador.
+
+
+def _insert(table):
+    # INSERT ... ON CONFLICT do dialeto em uso (SQLite e PostgreSQL têm a mesma API)
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _price(value) -> Decimal | None:
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value).replace(",", "."))
+    except InvalidOperation:
+        return None
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "sim", "s", "on", "yes")
+
+
+def _split(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [v.strip() for v in str(value).split("|") if v.strip()]
+
+
+def _ensure_named(conn: Connection, model, rows: list[dict]) -> dict[str, int]:
+    # tipos_suite.nome e amenidades.nome não são únicos no schema: resolve por nome
+    # numa única consulta e insere só os ausentes, em lote.
+    existing = {nome: id_ for id_, nome in conn.execute(select(model.id, model.nome)).all()}
+    missing: dict[str, dict] = {}
+    for r in rows:
+        nome = (r.get("nome") or "").strip()
+        if nome and nome not in existing and nome not in missing:
+            missing[nome] = {**r, "nome": nome}
+    for batch in _chunks(list(missing.values())):
+        conn.execute(model.__table__.insert(), batch)
+    if missing:
+        existing = {nome: id_ for id_, nome in conn.execute(select(model.id, model.nome)).all()}
+    return existing
+
+
+def load_file(path: Path) -> dict:
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8-sig") as fh:
+            return {"suites": list(csv.DictReader(fh))}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        return {"suites": data}
+    return data
+
+
+def import_catalog(data: dict) -> dict[str, int]:
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index()
+    suites_in = data.get("suites") or []
+
+    tipos_rows = [
+        {"nome": t.get("nome"), "descricao": t.get("descricao") or None, "ordem": int(t.get("ordem") or 0)}
+        for t in (data.get("tipos") or [])
+    ]
+    tipos_rows += [{"nome": s.get("tipo"), "descricao": None, "ordem": 0} for s in suites_in if s.get("tipo")]
+    amen_rows = [{"nome": a.get("nome"), "icone": a.get("icone") or None} for a in (data.get("amenidades") or [])]
+    amen_rows += [{"nome": n, "icone": None} for s in suites_in for n in _split(s.get("amenidades"))]
+
+    stats = {"tipos": 0, "amenidades": 0, "suites": 0, "suite_amenidade": 0, "fotos": 0}
+    with engine.begin() as conn:
+        tipos_map = _ensure_named(conn, TipoSuite, tipos_rows)
+        amen_map = _ensure_named(conn, Amenidade, amen_rows)
+        stats["tipos"] = len(tipos_map)
+        stats["amenidades"] = len(amen_map)
+
+        # Deduplica por slug (a última ocorrência vence), como faria o upsert
+        by_slug: dict[str, dict] = {}
+        for s in suites_in:
+            titulo = (s.get("titulo") or "").strip()
+            slug = (s.get("slug") or "").strip() or slugify(titulo)
+            if not titulo or not slug:
+                continue
+            by_slug[slug] = s | {"titulo": titulo, "slug": slug}
+
+        upd_cols = ["titulo", "tipo_id", "descricao", "preco_hora", "preco_pernoite", "destaque", "ordem", "status"]
+        for batch in _chunks(list(by_slug.values())):
+            rows = [
+                {
+                    "titulo": s["titulo"],
+                    "slug": s["slug"],
+                    "tipo_id": tipos_map.get((s.get("tipo") or "").strip()),
+                    "descricao": s.get("descricao") or None,
+                    "preco_hora": _price(s.get("preco_hora")),
+                    "preco_pernoite": _price(s.get("preco_pernoite")),
+                    "destaque": _bool(s.get("destaque")),
+                    "ordem": int(s.get("ordem") or 0),
+                    "status": s.get("status") or "ativo",
+                }
+                for s in batch
+            ]
+            stmt = _insert(Suite.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Suite.__table__.c.slug],
+                set_={c: stmt.excluded[c] for c in upd_cols},
+            )
+            conn.execute(stmt, rows)
+            stats["suites"] += len(rows)
+
+            ids = dict(conn.execute(select(Suite.slug, Suite.id).where(Suite.slug.in_([s["slug"] for s in batch]))).all())
+
+            # Amenidades: substitui o conjunto de cada suíte que trouxe a coluna
+            with_amen = [s for s in batch if "amenidades" in s]
+            if with_amen:
+                conn.execute(delete(suite_amenidade).where(suite_amenidade.c.suite_id.in_([ids[s["slug"]] for s in with_amen])))
+                assoc = [
+                    {"suite_id": ids[s["slug"]], "amenidade_id": amen_map[n]}
+                    for s in with_amen
+                    for n in dict.fromkeys(_split(s.get("amenidades")))
+                    if n in amen_map
+                ]
+                if assoc:
+                    conn.execute(_insert(suite_amenidade).on_conflict_do_nothing(), assoc)
+                    stats["suite_amenidade"] += len(assoc)
+
+            # Fotos: idem, substitui as fotos das suítes que trouxeram a coluna
+            with_fotos = [s for s in batch if "fotos" in s]
+            if with_fotos:
+                conn.execute(delete(Foto.__table__).where(Foto.suite_id.in_([ids[s["slug"]] for s in with_fotos])))
+                fotos_rows = []
+                for s in with_fotos:
+                    fotos = [f if isinstance(f, dict) else {"url": f} for f in _split(s.get("fotos"))]
+                    # exatamente uma capa por suíte (índice único parcial em fotos): a primeira marcada, ou a primeira
+                    capa_idx = next((i for i, f in enumerate(fotos) if _bool(f.get("capa"))), 0)
+                    for idx, f in enumerate(fotos):
+                        fotos_rows.append({
+                            "suite_id": ids[s["slug"]],
+                            "url": f["url"],
+                            "legenda": f.get("legenda") or None,
+                            "ordem": int(f.get("ordem", idx)),
+                            "capa": idx == capa_idx,
+                        })
+                if fotos_rows:
+                    conn.execute(Foto.__table__.insert(), fotos_rows)
+                    stats["fotos"] += len(fotos_rows)
+
+            reindex_suites(conn, list(ids.values()))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa/atualiza o catálogo de suítes em lote (idempotente)")
+    parser.add_argument("arquivo", type=str, help="arquivo .json ou .csv")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stats = import_catalog(load_file(Path(args.arquivo)))
+    print(
+        f"OK em {time.perf_counter() - t0:.2f}s: {stats['suites']} suítes, {stats['tipos']} tipos, "
+        f"{stats['amenidades']} amenidades, {stats['suite_amenidade']} vínculos, {stats['fotos']} fotos"
+    )
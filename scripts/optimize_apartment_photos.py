@@ -1,9 +1,144 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import tempfile
+import time
 from pathlib import Path
 
-from PIL import Image
+from PIL import Image, ImageOps
+
+from app.images import placeholder
+
+EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+NEAR_DUPLICATE_DISTANCE = 6  # bits diferentes (de 64) no hash perceptual
+
+
+def _done(path: Path) -> bool:
+    return path.exists() and path.stat().st_size > 0
+
+
+def _outputs(src: Path, dst_dir: Path, max_size: int, thumb_size: int) -> list[tuple[int, Path]]:
+    # variantes da maior para a menor: cada uma é derivada da anterior (cascata)
+    return [
+        (max_size, dst_dir / f"{src.stem}.webp"),
+        (thumb_size, dst_dir / f"{src.stem}-{thumb_size}.webp"),
+    ]
+
+
+def open_reduced(src: Path, target: int) -> Image.Image:
+    # Decodifica já perto do tamanho final: no JPEG, draft() usa a escala 1/2, 1/4 ou 1/8
+    # do próprio decodificador (o original de 24MP nunca é montado inteiro na memória);
+    # nos demais formatos, reduce() por fator inteiro antes do LANCZOS.
+    im = Image.open(src)
+    w, h = im.size
+    ratio = min(1.0, target / max(w, h))
+    box = (max(1, round(w * ratio)), max(1, round(h * ratio)))
+    if im.format == "JPEG":
+        im.draft("RGB", box)
+        im.load()
+    else:
+        factor = int(max(w, h) // target) if max(w, h) >= 2 * target else 1
+        if factor > 1:
+            im = im.reduce(factor)
+    # rotação da câmera (EXIF Orientation) aplicada já na imagem reduzida
+    im = ImageOps.exif_transpose(im)
+    if im.mode != "RGB":
+        im = im.convert("RGB")
+    return im
+
+
+def render_variants(src: Path, outputs: list[tuple[int, Path]], quality: int, skip_existing: bool) -> None:
+    im = open_reduced(src, outputs[0][0])
+    try:
+        for size, dst in outputs:
+            # thumbnail() reduz no lugar: a variante seguinte parte da atual, sem cópias
+            im.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if not (skip_existing and _done(dst)):
+                im.save(dst, format="WEBP", quality=quality, method=6)
+    finally:
+        im.close()
+
+
+def render_variants_legacy(src: Path, outputs: list[tuple[int, Path]], quality: int, skip_existing: bool) -> None:
+    # caminho anterior (original inteiro em RGB + uma cópia por variante), mantido para o --benchmark
+    with Image.open(src) as im:
+        im = im.convert("RGB")
+        for size, dst in outputs:
+            variant = im.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if not (skip_existing and _done(dst)):
+                variant.save(dst, format="WEBP", quality=quality, method=6)
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dhash(src: Path) -> str:
+    # Hash perceptual (dHash, 64 bits): compara o brilho de pixels vizinhos numa miniatura
+    # 9x8 em tons de cinza; fotos iguais em outra resolução/qualidade dão o mesmo hash.
+    with open_reduced(src, 64) as im:
+        small = im.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def hamming(a: str, b: str) -> int:
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+def load_manifest(dst_dir: Path) -> dict:
+    path = dst_dir / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "fotos": {}}
+    if data.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "fotos": {}}
+    return data
+
+
+def save_manifest(dst_dir: Path, manifest: dict) -> None:
+    path = dst_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _fingerprint(src: Path, entry: dict | None) -> dict:
+    # sha256 + hash perceptual, reaproveitados do manifest enquanto tamanho/mtime não mudarem
+    st = src.stat()
+    if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        return {k: entry[k] for k in ("size", "mtime_ns", "sha256", "phash")}
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(src), "phash": dhash(src)}
+
+
+def _placeholders(outputs: list[tuple[int, Path]], cached: dict | None) -> dict:
+    # largura/altura de cada variante + cor dominante e LQIP (da menor), para o HTML reservar
+    # o espaço da foto; reaproveitados do manifest enquanto as variantes não forem refeitas
+    names = [dst.name for _size, dst in outputs]
+    if cached and "lqip" in cached and all(n in cached.get("variantes", {}) for n in names):
+        return {k: cached[k] for k in ("variantes", "cor", "lqip")}
+    variantes = {}
+    for _size, dst in outputs:
+        with Image.open(dst) as im:
+            variantes[dst.name] = {"w": im.width, "h": im.height}
+    meta = placeholder(outputs[-1][1])
+    return {"variantes": variantes, "cor": meta["cor"], "lqip": meta["lqip"]}
 
 
 def optimize(
@@ -15,42 +150,133 @@ def optimize(
     quality: int = 82,
     limit: int | None = None,
     skip_existing: bool = True,
-) -> None:
+    legacy: bool = False,
+    near_distance: int = NEAR_DUPLICATE_DISTANCE,
+) -> int:
     dst_dir.mkdir(parents=True, exist_ok=True)
+    render = render_variants_legacy if legacy else render_variants
+    manifest = load_manifest(dst_dir)
+    previous: dict = manifest["fotos"]
+    entries: dict[str, dict] = {}
+    by_sha: dict[str, str] = {}
+    kept: list[tuple[str, str]] = []
+    duplicates: list[tuple[str, str]] = []
+    near: list[tuple[str, str, int]] = []
 
-    exts = {".jpg", ".jpeg", ".png", ".webp"}
     processed = 0
     for src in sorted(src_dir.iterdir()):
-        if not src.is_file() or src.suffix.lower() not in exts:
+        if not src.is_file() or src.suffix.lower() not in EXTS:
             continue
+        if limit is not None and processed >= limit:
+            break
 
-        out_name = f"{src.stem}.webp"
-        dst = dst_dir / out_name
-        thumb_name = f"{src.stem}-{thumb_size}.webp"
-        dst_thumb = dst_dir / thumb_name
-        if skip_existing and dst.exists() and dst.stat().st_size > 0:
-            if dst_thumb.exists() and dst_thumb.stat().st_size > 0:
-                continue
+        entry = _fingerprint(src, previous.get(src.name))
+        entries[src.name] = entry
+        outputs = _outputs(src, dst_dir, max_size, thumb_size)
 
-        with Image.open(src) as im:
-            im = im.convert("RGB")
+        # Duplicata exata (mesmos bytes): não codifica e remove variantes antigas, para não
+        # irem para a galeria. Semelhança pelo hash perceptual só é relatada (pode ser outra foto).
+        original = by_sha.get(entry["sha256"])
+        if original is not None:
+            entry["duplicate_of"] = original
+            duplicates.append((src.name, original))
+            for _size, dst in outputs:
+                dst.unlink(missing_ok=True)
+            continue
+        by_sha[entry["sha256"]] = src.name
+
+        similar = [(name, hamming(entry["phash"], ph)) for name, ph in kept]
+        similar = [(name, d) for name, d in similar if d <= near_distance]
+        if similar:
+            entry["near"] = [name for name, _d in similar]
+            near.extend((src.name, name, d) for name, d in similar)
+        kept.append((src.name, entry["phash"]))
 
-            im_full = im.copy()
-            im_full.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            if not (skip_existing and dst.exists() and dst.stat().st_size > 0):
-                im_full.save(dst, format="WEBP", quality=quality, method=6)
+        if skip_existing and all(_done(dst) for _size, dst in outputs):
+            entry.update(_placeholders(outputs, previous.get(src.name)))
+            continue
 
-            im_thumb = im.copy()
-            im_thumb.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS)
-            if not (skip_existing and dst_thumb.exists() and dst_thumb.stat().st_size > 0):
-                im_thumb.save(dst_thumb, format="WEBP", quality=quality, method=6)
+        render(src, outputs, quality, skip_existing)
+        entry.update(_placeholders(outputs, None))
 
         processed += 1
         if processed % 10 == 0:
             print(f"Processadas: {processed} (última: {src.name})")
 
-        if limit is not None and processed >= limit:
-            break
+    # com --limit o restante da pasta não foi visto: mantém as entradas anteriores
+    if limit is not None:
+        entries = {**{k: v for k, v in previous.items() if (src_dir / k).exists()}, **entries}
+    manifest["fotos"] = entries
+    save_manifest(dst_dir, manifest)
+
+    if duplicates:
+        print(f"Duplicatas exatas ignoradas: {len(duplicates)}")
+        for name, original in duplicates:
+            print(f"  {name} = {original}")
+    if near:
+        print(f"Quase duplicatas (distância <= {near_distance}): {len(near)}")
+        for name, other, d in near:
+            print(f"  {name} ~ {other} ({d})")
+    return processed
+
+
+def update_fotos_db(src_dir: Path, dst_dir: Path) -> int:
+    # Preenche o placeholder (dimensões, cor, LQIP) das fotos cadastradas que apontam para
+    # arquivos locais e ainda não têm; as colunas são criadas pela migração leve do app.
+    from sqlalchemy import select
+
+    from app.database import get_session
+    from app.models import Foto
+
+    roots = {
+        "/fotos-apartamentos-web/": dst_dir,
+        "/fotos-apartamentos/": src_dir,
+        "/static/": Path(__file__).resolve().parents[1] / "app" / "static",
+    }
+    updated = 0
+    with get_session() as db:
+        for foto in db.execute(select(Foto).where(Foto.lqip.is_(None))).scalars():
+            path = next((root / foto.url[len(prefix):] for prefix, root in roots.items() if foto.url.startswith(prefix)), None)
+            if path is None or not path.is_file() or path.suffix.lower() not in EXTS:
+                continue
+            meta = placeholder(path)
+            foto.largura, foto.altura, foto.cor, foto.lqip = meta["w"], meta["h"], meta["cor"], meta["lqip"]
+            updated += 1
+        db.commit()
+    return updated
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def benchmark(src_dir: Path, args) -> None:
+    # Cada caminho roda num processo próprio, para o pico de memória (RSS) ser só dele
+    print(f"{'caminho':<8} {'fotos':>6} {'tempo s':>9} {'s/foto':>8} {'pico RSS MB':>12}")
+    for mode in ("legacy", "novo"):
+        with tempfile.TemporaryDirectory(prefix="bv-fotos-") as tmp:
+            cmd = [
+                sys.executable, "-m", "scripts.optimize_apartment_photos",
+                "--src-dir", str(src_dir), "--dst-dir", tmp,
+                "--max-size", str(args.max_size), "--thumb-size", str(args.thumb_size),
+                "--quality", str(args.quality), "--no-skip-existing", "--_report",
+            ]
+            if args.limit is not None:
+                cmd += ["--limit", str(args.limit)]
+            if mode == "legacy":
+                cmd.append("--legacy")
+            out = subprocess.run(
+                cmd, cwd=str(Path(__file__).resolve().parents[1]), capture_output=True, text=True, check=True
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+        per = r["seconds"] / r["processed"] if r["processed"] else 0.0
+        peak = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/d"
+        print(f"{mode:<8} {r['processed']:>6} {r['seconds']:>9.2f} {per:>8.2f} {peak:>12}")
 
 
 if __name__ == "__main__":
@@ -62,13 +288,25 @@ if __name__ == "__main__":
     parser.add_argument("--quality", type=int, default=82)
     parser.add_argument("--limit", type=int, default=None)
     parser.add_argument("--no-skip-existing", action="store_true")
+    parser.add_argument("--near-distance", type=int, default=NEAR_DUPLICATE_DISTANCE,
+                        help="distância máxima (bits) para relatar quase duplicatas")
+    parser.add_argument("--legacy", action="store_true", help="usa o caminho antigo (decodificação completa)")
+    parser.add_argument("--update-db", action="store_true",
+                        help="preenche dimensões/cor/LQIP das fotos cadastradas (tabela fotos) com arquivo local")
+    parser.add_argument("--benchmark", action="store_true", help="compara tempo e pico de memória: antigo x novo")
+    parser.add_argument("--_report", action="store_true", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
     project_root = Path(__file__).resolve().parents[1]
     src_dir = Path(args.src_dir) if args.src_dir else (project_root / "fotos_apartamentos")
     dst_dir = Path(args.dst_dir) if args.dst_dir else (project_root / "fotos_apartamentos_web")
 
-    optimize(
+    if args.benchmark:
+        benchmark(src_dir, args)
+        sys.exit(0)
+
+    t0 = time.perf_counter()
+    processed = optimize(
         src_dir,
         dst_dir,
         max_size=args.max_size,
@@ -76,5 +314,12 @@ if __name__ == "__main__":
         quality=args.quality,
         limit=args.limit,
         skip_existing=not args.no_skip_existing,
+        legacy=args.legacy,
+        near_distance=args.near_distance,
     )
-    print(f"OK: fotos otimizadas em: {dst_dir}")
+    if args._report:
+        print(json.dumps({"processed": processed, "seconds": time.perf_counter() - t0, "peak_rss_mb": _peak_rss_mb()}))
+    else:
+        print(f"OK: fotos otimizadas em: {dst_dir}")
+    if args.update_db:
+        print(f"Fotos cadastradas com placeholder novo: {update_fotos_db(src_dir, dst_dir)}")
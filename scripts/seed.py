@@ -1,3 +1,5 @@
+import argparse
+
 from app.database import get_session, Base, engine
 from app.models import SiteConfig, TipoSuite, Amenidade, Suite
 from sqlalchemy import select
@@ -100,5 +102,47 @@ def main():
     print("Seed aplicado com sucesso")
 
 
+def seed_synthetic(suites: int, fotos: int = 4, amenidades: int = 8) -> None:
+    # Massa sintética para benchmarks: N suítes, M fotos por suíte, K amenidades.
+    # Usa o importador em lote (upsert por slug), então é idempotente.
+    from scripts.import_catalog import import_catalog
+
+    amen_nomes = [f"Amenidade {i + 1}" for i in range(amenidades)]
+    tipos_nomes = ["Standard", "Luxo", "Temática"]
+    rows = []
+    for i in range(suites):
+        titulo = f"Suíte Sintética {i + 1}"
+        rows.append({
+            "titulo": titulo,
+            "slug": f"suite-sintetica-{i + 1}",
+            "tipo": tipos_nomes[i % len(tipos_nomes)],
+            "descricao": f"{titulo} gerada para testes de carga.",
+            "preco_hora": f"{100 + (i % 7) * 10}.00",
+            "preco_pernoite": f"{220 + (i % 7) * 10}.00",
+            "destaque": i % 10 == 0,
+            "ordem": i,
+            "amenidades": [amen_nomes[(i + j) % amenidades] for j in range(min(amenidades, 1 + i % 5))],
+            "fotos": [
+                {"url": "/static/img/logo.png", "legenda": f"{titulo} — foto {j + 1}", "capa": j == 0}
+                for j in range(fotos)
+            ],
+        })
+    import_catalog({
+        "tipos": [{"nome": n, "ordem": i} for i, n in enumerate(tipos_nomes)],
+        "amenidades": [{"nome": n} for n in amen_nomes],
+        "suites": rows,
+    })
+    print(f"Seed sintético aplicado: {suites} suítes, {fotos} fotos/suíte, {amenidades} amenidades")
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suites", type=int, default=None, help="gera massa sintética com N suítes")
+    parser.add_argument("--fotos", type=int, default=4, help="fotos por suíte sintética")
+    parser.add_argument("--amenidades", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.suites is None:
+        main()
+    else:
+        seed_synthetic(args.suites, fotos=args.fotos, amenidades=args.amenidades)